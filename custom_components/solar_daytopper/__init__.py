@@ -1,18 +1,48 @@
-import aiohttp
-import asyncio
 import logging
-from datetime import timedelta, datetime
+from datetime import timedelta
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers import (
+    config_validation as cv,
+    device_registry as dr,
+    entity_registry as er,
+)
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, SCAN_INTERVAL
-from .utils import resolve_mdns_url
+from .const import (
+    DOMAIN,
+    DATA_FLEET,
+    CONF_PUSH_MODE,
+    CONF_WEBHOOK_ID,
+    CONF_REPLAY_MODE,
+    CONF_REPLAY_FILE,
+    CONF_REPLAY_INVERTERS,
+    CONF_REPLAY_SPEED,
+    REPLAY_OFF,
+    DEFAULT_REPLAY_MODE,
+    DEFAULT_REPLAY_INVERTERS,
+    DEFAULT_REPLAY_SPEED,
+)
+from .coordinator import DaytopperCoordinator
+from .fetcher import DaytopperFetcher
+from .fleet import DaytopperFleet
+from .cache import PayloadCache
+from .history import HistoryStore
+from .push import async_setup_push
+from .replay import ReplayMonitor, ReplayScheduler, create_replay_fetcher, replay_chip_id
+from .services import async_setup_services
+from .utils import legacy_unique_id_suffix, make_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    async_setup_services(hass)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     api_url = entry.data.get("host")
 
@@ -20,61 +50,87 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         _LOGGER.error("No host given for Daytopper.")
         raise ConfigEntryNotReady("No host address available.")
 
-    async def async_update_data():
-        _LOGGER.debug("Fetching data from: %s", api_url)
-        
-        # Resolve mDNS if needed
-        fetch_url = await resolve_mdns_url(api_url)
-        if fetch_url != api_url:
-            _LOGGER.debug("Using resolved URL: %s", fetch_url)
-        
+    # One poll schedule and connection pool shared by all configured devices
+    if DATA_FLEET not in hass.data:
+        hass.data[DATA_FLEET] = DaytopperFleet(hass, DaytopperFetcher())
+    fleet = hass.data[DATA_FLEET]
+    fleet.users.add(entry.entry_id)
+
+    replay_mode = entry.options.get(CONF_REPLAY_MODE, DEFAULT_REPLAY_MODE)
+    if replay_mode == REPLAY_OFF:
+        coordinator = DaytopperCoordinator(hass, api_url, fleet.fetcher, fleet)
+        _async_remove_replay_device(hass, entry)
+    else:
+        # Recorded or synthetic payloads at an accelerated clock, outside the fleet schedule
+        _LOGGER.warning("Solar Daytopper %s runs in %s replay mode, the device is not contacted", entry.title, replay_mode)
+        fetcher = create_replay_fetcher(
+            hass,
+            replay_mode,
+            entry.options.get(CONF_REPLAY_FILE),
+            entry.options.get(CONF_REPLAY_INVERTERS, DEFAULT_REPLAY_INVERTERS),
+            replay_chip_id(entry.entry_id),
+        )
+        entry.async_on_unload(fetcher.async_close)
+        scheduler = ReplayScheduler(entry.options.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED))
+        coordinator = DaytopperCoordinator(hass, api_url, fetcher, scheduler=scheduler)
+
+    # Build the entities from the last known payload, the device is fetched in the background.
+    # Replayed payloads are not cached or recorded, their clock runs ahead of the real one.
+    cache = PayloadCache(hass, entry.entry_id)
+    cached = await cache.async_load() if replay_mode == REPLAY_OFF else None
+    if cached is not None:
+        _LOGGER.debug("Starting from cached payload")
+        coordinator.async_restore(*cached)
+    else:
+        _LOGGER.debug("Starting first refresh")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(fetch_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                    _LOGGER.debug("Received response with status: %s", response.status)
-                    response.raise_for_status()
-                    data = await response.json()
-                    
-                    # Add timestamp when data was fetched
-                    data["_last_update"] = datetime.now().isoformat()
-                    
-                    _LOGGER.debug("Successfully fetched data: %s keys", list(data.keys()) if isinstance(data, dict) else "non-dict data")
-                    return data
-        except asyncio.TimeoutError:
-            _LOGGER.error("Timeout while fetching data from Daytopper API (%s)", fetch_url)
-            raise
-        except aiohttp.ClientError as err:
-            _LOGGER.error("HTTP error fetching data from Daytopper API (%s): %s", fetch_url, err)
-            raise
+            await coordinator.async_config_entry_first_refresh()
+            _LOGGER.debug("First refresh completed successfully")
         except Exception as err:
-            _LOGGER.error("Unexpected error fetching data from Daytopper API (%s): %s", fetch_url, err)
-            raise
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=DOMAIN,
-        update_method=async_update_data,
-        update_interval=SCAN_INTERVAL,
-    )
-
-    _LOGGER.debug("Starting first refresh")
-    try:
-        await coordinator.async_config_entry_first_refresh()
-        _LOGGER.debug("First refresh completed successfully")
-    except Exception as err:
-        _LOGGER.error("First refresh failed: %s", err)
-        raise ConfigEntryNotReady from err
+            _LOGGER.error("First refresh failed: %s", err)
+            await _async_release_fleet(hass, entry)
+            raise ConfigEntryNotReady from err
+
+    chip_id = coordinator.snapshot.chip_id
+    if chip_id is not None and replay_mode == REPLAY_OFF:
+        await _async_migrate_unique_ids(hass, entry, str(chip_id))
+
+    # Keep a local production history next to the recorder
+    history = HistoryStore(hass, entry.entry_id)
+    await history.async_load()
+    if replay_mode == REPLAY_OFF:
+        if cached is None:
+            history.async_record(coordinator.data)
+        entry.async_on_unload(
+            coordinator.async_add_listener(lambda: history.async_record(coordinator.data))
+        )
+        cache.async_save(coordinator)
+        entry.async_on_unload(
+            coordinator.async_add_listener(lambda: cache.async_save(coordinator))
+        )
+    else:
+        entry.async_on_unload(ReplayMonitor(hass, coordinator).async_start())
+
+    # Readings posted by the device replace polls while they keep coming
+    if entry.options.get(CONF_PUSH_MODE) and entry.options.get(CONF_WEBHOOK_ID):
+        entry.async_on_unload(
+            async_setup_push(hass, entry, coordinator, entry.options[CONF_WEBHOOK_ID])
+        )
 
     _LOGGER.debug("Storing coordinator data")
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
         "coordinator": coordinator,
         "host": api_url,
+        "history": history,
     }
 
     _LOGGER.debug("Setting up sensor platform")
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
-    
+
+    if cached is not None:
+        # Poll as soon as the fleet has room, devices restored together are spread out
+        fleet.async_schedule(coordinator, timedelta())
+
     _LOGGER.debug("Solar Daytopper setup completed successfully")
 
     return True
@@ -82,5 +138,47 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, ["sensor"])
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await entry_data["history"].async_close()
+        await _async_release_fleet(hass, entry)
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await HistoryStore(hass, entry.entry_id).async_remove()
+    await PayloadCache(hass, entry.entry_id).async_remove()
+
+async def _async_release_fleet(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Stop the shared fleet once no device uses it anymore."""
+    fleet = hass.data[DATA_FLEET]
+    fleet.fetcher.forget(entry.data.get("host"))
+    fleet.users.discard(entry.entry_id)
+    if not fleet.users:
+        hass.data.pop(DATA_FLEET)
+        fleet.async_shutdown()
+        await fleet.fetcher.async_close()
+
+@callback
+def _async_remove_replay_device(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the device and entities left behind by an earlier replay."""
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device(identifiers={(DOMAIN, replay_chip_id(entry.entry_id))})
+    if device is not None:
+        _LOGGER.debug("Removing replay device %s", device.id)
+        device_registry.async_remove_device(device.id)
+
+
+async def _async_migrate_unique_ids(hass: HomeAssistant, entry: ConfigEntry, chip_id: str) -> None:
+    """Scope entity unique IDs and the entry itself to the device chipId."""
+    if entry.unique_id is None:
+        hass.config_entries.async_update_entry(entry, unique_id=chip_id)
+
+    @callback
+    def _migrate(entity_entry):
+        suffix = legacy_unique_id_suffix(entity_entry.unique_id)
+        if suffix is None:
+            return None
+        new_unique_id = make_unique_id(chip_id, suffix)
+        _LOGGER.debug("Migrating unique ID %s to %s", entity_entry.unique_id, new_unique_id)
+        return {"new_unique_id": new_unique_id}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _migrate)
@@ -0,0 +1,119 @@
+"""Derived statistics per inverter, updated incrementally on every new reading."""
+import logging
+from collections import deque
+
+from homeassistant.util import dt as dt_util
+
+from .const import ROLLING_AVERAGE_WINDOW, IMBALANCE_THRESHOLD
+from .energy import EnergyCounter
+from .utils import WH_PER_KWH, as_number
+
+_LOGGER = logging.getLogger(__name__)
+
+IMBALANCE_IDLE = "idle"
+IMBALANCE_BALANCED = "balanced"
+IMBALANCE_LOW = "low"
+IMBALANCE_STALLED = "stalled"
+IMBALANCE_STATES = [IMBALANCE_IDLE, IMBALANCE_BALANCED, IMBALANCE_LOW, IMBALANCE_STALLED]
+
+
+def imbalance(power, total_power, inverter_count):
+    """Classify power of one inverter against the average of all inverters."""
+    if not total_power or inverter_count < 2:
+        return IMBALANCE_IDLE if not total_power else IMBALANCE_BALANCED
+    if not power:
+        return IMBALANCE_STALLED
+    if power < IMBALANCE_THRESHOLD * total_power / inverter_count:
+        return IMBALANCE_LOW
+    return IMBALANCE_BALANCED
+
+
+class RunningStats:
+    """Today's yield and peak, and the rolling average power of one inverter.
+
+    Every reading updates the statistics in constant time: the yield from the
+    counter delta, the peak by comparison, and the average from a running sum
+    over a ring buffer of the readings inside ROLLING_AVERAGE_WINDOW.
+    """
+
+    def __init__(self, name, window=ROLLING_AVERAGE_WINDOW):
+        self.name = name
+        self._window = window.total_seconds()
+        self._samples = deque()
+        self._sum = 0.0
+        self.day = None
+        self.today_wh = 0.0
+        self.peak_power = None
+        self.peak_time = None
+        self.share = None
+        self.imbalance = None
+        self.last_timestamp = None
+        self.counter = EnergyCounter()
+        self._first_sample = None
+
+    @property
+    def today(self):
+        return round(self.today_wh / WH_PER_KWH, 3) if self.day is not None else None
+
+    @property
+    def average_power(self):
+        return round(self._sum / len(self._samples), 1) if self._samples else None
+
+    def update(self, timestamp, power, total):
+        """Add a new reading, ignored if it is not newer than the previous one."""
+        power = as_number(power)
+        total = as_number(total)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return
+        if self.last_timestamp is None:
+            self._first_sample = (timestamp, total)
+
+        day = dt_util.as_local(dt_util.utc_from_timestamp(timestamp)).date()
+        if day != self.day:
+            self.day = day
+            self.today_wh = 0.0
+            self.peak_power = None
+            self.peak_time = None
+
+        if total is not None:
+            self.today_wh += self.counter.update(total) or 0.0
+
+        if power is not None:
+            if self.peak_power is None or power > self.peak_power:
+                self.peak_power = power
+                self.peak_time = dt_util.utc_from_timestamp(timestamp)
+
+            self._samples.append((timestamp, power))
+            self._sum += power
+            while self._samples[0][0] <= timestamp - self._window:
+                self._sum -= self._samples.popleft()[1]
+        self.last_timestamp = timestamp
+
+    def restore(self, state):
+        """Continue today's yield and peak from before a restart."""
+        day = state.get("day")
+        if day is None or self.day is None or day != self.day.isoformat():
+            return
+
+        today_wh = as_number(state.get("today_wh")) or 0.0
+        last_total = as_number(state.get("last_total"))
+        if self._first_sample is not None and last_total is not None:
+            # Energy produced while Home Assistant was not running
+            first_total = self._first_sample[1]
+            if first_total is not None:
+                today_wh += EnergyCounter(last_total).update(first_total) or 0.0
+        self.today_wh += today_wh
+
+        peak_power = as_number(state.get("peak_power"))
+        if peak_power is not None and (self.peak_power is None or peak_power > self.peak_power):
+            self.peak_power = peak_power
+            self.peak_time = dt_util.parse_datetime(state.get("peak_time") or "")
+
+    def as_dict(self):
+        return {
+            "day": self.day.isoformat() if self.day is not None else None,
+            "today_wh": self.today_wh,
+            "last_total": self.counter.mark,
+            "peak_power": self.peak_power,
+            "peak_time": self.peak_time.isoformat() if self.peak_time is not None else None,
+        }
@@ -0,0 +1,36 @@
+"""Last known payload of a Solar Daytopper, to start without waiting for the device."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, CACHE_STORAGE_VERSION, CACHE_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PayloadCache:
+    """Persist the last good payload and the known inverters of an entry."""
+
+    def __init__(self, hass, entry_id):
+        self._store = Store(hass, CACHE_STORAGE_VERSION, f"{DOMAIN}.cache.{entry_id}")
+
+    async def async_load(self):
+        """Return (payload, inverters) of the last run, or None."""
+        cached = await self._store.async_load()
+        if not cached or not isinstance(cached.get("data"), dict):
+            return None
+        return cached["data"], list(cached.get("inverters") or [])
+
+    @callback
+    def async_save(self, coordinator):
+        """Schedule a write of the current payload, if it is a good one."""
+        if not coordinator.last_update_success or not isinstance(coordinator.data, dict):
+            return
+        self._store.async_delay_save(
+            lambda: {"data": coordinator.data, "inverters": list(coordinator.known_inverters)},
+            CACHE_SAVE_DELAY,
+        )
+
+    async def async_remove(self):
+        await self._store.async_remove()
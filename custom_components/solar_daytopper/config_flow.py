@@ -1,12 +1,32 @@
 from homeassistant import config_entries
+from homeassistant.components import webhook
+from homeassistant.components.zeroconf import ZeroconfServiceInfo
 from homeassistant.core import callback
 import voluptuous as vol
-from urllib.parse import urlparse
-import aiohttp
-import async_timeout
 import logging
-from .const import DOMAIN
-from .utils import resolve_mdns_url
+import os
+from .const import (
+    DOMAIN,
+    CONF_DEADBAND_WATTS,
+    CONF_DEADBAND_PERCENT,
+    DEFAULT_DEADBAND_WATTS,
+    DEFAULT_DEADBAND_PERCENT,
+    CONF_PUSH_MODE,
+    CONF_WEBHOOK_ID,
+    DEFAULT_PUSH_MODE,
+    CONF_REPLAY_MODE,
+    CONF_REPLAY_FILE,
+    CONF_REPLAY_INVERTERS,
+    CONF_REPLAY_SPEED,
+    REPLAY_MODES,
+    REPLAY_OFF,
+    REPLAY_FILE,
+    DEFAULT_REPLAY_MODE,
+    DEFAULT_REPLAY_INVERTERS,
+    DEFAULT_REPLAY_SPEED,
+    MAX_REPLAY_SPEED,
+)
+from .validation import async_probe_daytopper, is_valid_url
 
 _LOGGER = logging.getLogger(__name__)
 DEFAULT_HOST = "http://daytopper.local"
@@ -16,29 +36,32 @@ class DaytopperConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_user(self, user_input=None):
         _LOGGER.debug("Solar Daytopper config flow started")
-        
-        # Check if there's already a config entry
-        if self._async_current_entries():
-            return self.async_abort(reason="already_configured")
-        
+
         errors = {}
 
         if user_input is not None:
             host = user_input["host"].rstrip("/")
             # Validate the host URL format
-            if not self._is_valid_url(host):
+            if not is_valid_url(host):
                 errors["host"] = "invalid_host"
             else:
-                # Test connection with the provided address
+                # Test connection with the provided address and its fallbacks
                 _LOGGER.debug("Starting connection test for: %s", host)
-                connection_test = await self._test_connection(host)
-                _LOGGER.debug("Connection test completed: %s", connection_test)
-                if not connection_test:
+                result = await async_probe_daytopper(self.hass, host)
+                _LOGGER.debug("Connection test completed: %s", result is not None)
+                if result is None:
                     errors["host"] = "cannot_connect"
                 else:
-                    # Make sure the host does not have a trailing slash
-                    user_input["host"] = host
-                    return self.async_create_entry(title="Solar Daytopper", data=user_input)
+                    host, payload = result
+                    # Every device can be configured once, identified by its chipId
+                    chip_id = payload["system"].get("chipId")
+                    if chip_id is not None:
+                        await self.async_set_unique_id(str(chip_id))
+                        self._abort_if_unique_id_configured(updates={"host": host})
+                    else:
+                        self._async_abort_entries_match({"host": host})
+
+                    return self._async_create_daytopper_entry(host, payload)
 
         schema = vol.Schema({
             vol.Required("host", default=DEFAULT_HOST): str,
@@ -46,37 +69,47 @@ class DaytopperConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
 
-    def _is_valid_url(self, url):
-        """Validate if the URL is valid."""
-        try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except Exception:
-            return False
+    async def async_step_zeroconf(self, discovery_info: ZeroconfServiceInfo):
+        """Handle a Daytopper announcing itself on the network."""
+        hostname = discovery_info.hostname.rstrip(".")
+        port = f":{discovery_info.port}" if discovery_info.port not in (None, 80) else ""
+        _LOGGER.debug("Discovered %s at %s", hostname, discovery_info.host)
+
+        # Keep the mDNS name, the IP address is probed as well
+        result = await async_probe_daytopper(
+            self.hass, f"http://{hostname}{port}", (f"http://{discovery_info.host}{port}",)
+        )
+        if result is None:
+            return self.async_abort(reason="not_daytopper")
+        host, payload = result
+
+        chip_id = payload["system"].get("chipId")
+        if chip_id is None:
+            return self.async_abort(reason="not_daytopper")
+        await self.async_set_unique_id(str(chip_id))
+        self._abort_if_unique_id_configured()
+
+        self._discovered = (host, payload)
+        self.context["title_placeholders"] = {"name": payload["system"].get("wifiHostname") or hostname}
+        return await self.async_step_zeroconf_confirm()
+
+    async def async_step_zeroconf_confirm(self, user_input=None):
+        host, payload = self._discovered
+        if user_input is not None:
+            return self._async_create_daytopper_entry(host, payload)
 
-    async def _test_connection(self, host):
-        """Test the connection with the host."""
-        _LOGGER.debug("Testing connection to: %s", host)
-
-        # For .local hosts, try IP address resolution first
-        test_url = host
-        if ".local" in host:
-            resolved_url = await resolve_mdns_url(host)
-            if resolved_url:
-                test_url = resolved_url
-                _LOGGER.debug("Resolved %s to %s", host, test_url)
-            else:
-                _LOGGER.debug("Could not resolve mDNS for %s, trying original URL", host)
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with async_timeout.timeout(10):  # Increase timeout for mDNS
-                    async with session.get(test_url) as response:
-                        _LOGGER.debug("Connection test result for %s: status %s", test_url, response.status)
-                        return response.status < 400
-        except Exception as err:
-            _LOGGER.debug("Connection test failed for %s: %s", test_url, err)
-            return False
+        self._set_confirm_only()
+        return self.async_show_form(
+            step_id="zeroconf_confirm",
+            description_placeholders={"name": self.context["title_placeholders"]["name"], "host": host},
+        )
+
+    @callback
+    def _async_create_daytopper_entry(self, host, payload):
+        title = "Solar Daytopper"
+        if payload["system"].get("wifiHostname"):
+            title = f"Solar Daytopper ({payload['system']['wifiHostname']})"
+        return self.async_create_entry(title=title, data={"host": host})
 
     @staticmethod
     @callback
@@ -92,62 +125,99 @@ class DaytopperOptionsFlow(config_entries.OptionsFlow):
         if user_input is not None:
             host = user_input["host"].rstrip("/")
 
+            replay_mode = user_input[CONF_REPLAY_MODE]
+            replay_file = self.hass.config.path(user_input.get(CONF_REPLAY_FILE) or "")
+
             # Validate the host URL format
-            if not self._is_valid_url(host):
+            if not is_valid_url(host):
                 errors["host"] = "invalid_host"
+            elif replay_mode == REPLAY_FILE and not (
+                self.hass.config.is_allowed_path(replay_file)
+                and await self.hass.async_add_executor_job(os.path.isfile, replay_file)
+            ):
+                errors[CONF_REPLAY_FILE] = "replay_file_missing"
             else:
-                # Test connection with the provided address
-                connection_test = await self._test_connection(host)
-                if not connection_test:
+                # The device is not contacted in replay mode
+                result = (host, None)
+                if replay_mode == REPLAY_OFF:
+                    # Test connection with the provided address and its fallbacks
+                    result = await async_probe_daytopper(self.hass, host)
+                if result is None:
                     errors["host"] = "cannot_connect"
+                elif self._is_other_device(result[1]):
+                    errors["host"] = "wrong_device"
                 else:
-                    # Update the config entry data instead of options
+                    host = result[0]
+                    # The host lives in the config entry data, everything else in options
                     new_data = dict(self.config_entry.data)
                     new_data["host"] = host
-                    
+                    new_options = dict(self.config_entry.options)
+                    new_options[CONF_DEADBAND_WATTS] = user_input[CONF_DEADBAND_WATTS]
+                    new_options[CONF_DEADBAND_PERCENT] = user_input[CONF_DEADBAND_PERCENT]
+                    new_options[CONF_PUSH_MODE] = user_input[CONF_PUSH_MODE]
+                    if user_input[CONF_PUSH_MODE] and not new_options.get(CONF_WEBHOOK_ID):
+                        new_options[CONF_WEBHOOK_ID] = webhook.async_generate_id()
+                    new_options[CONF_REPLAY_MODE] = replay_mode
+                    new_options[CONF_REPLAY_FILE] = replay_file if replay_mode == REPLAY_FILE else None
+                    new_options[CONF_REPLAY_INVERTERS] = user_input[CONF_REPLAY_INVERTERS]
+                    new_options[CONF_REPLAY_SPEED] = user_input[CONF_REPLAY_SPEED]
+
                     self.hass.config_entries.async_update_entry(
-                        self.config_entry, data=new_data
+                        self.config_entry, data=new_data, options=new_options
                     )
                     
                     # Reload the integration to apply new settings
                     await self.hass.config_entries.async_reload(self.config_entry.entry_id)
                     
-                    return self.async_create_entry(title="", data={})
+                    return self.async_create_entry(title="", data=new_options)
 
+        options = self.config_entry.options
         schema = vol.Schema({
             vol.Required("host", default=self.config_entry.data.get("host", DEFAULT_HOST)): str,
+            vol.Optional(
+                CONF_DEADBAND_WATTS,
+                default=options.get(CONF_DEADBAND_WATTS, DEFAULT_DEADBAND_WATTS),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(
+                CONF_DEADBAND_PERCENT,
+                default=options.get(CONF_DEADBAND_PERCENT, DEFAULT_DEADBAND_PERCENT),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+            vol.Optional(
+                CONF_PUSH_MODE,
+                default=options.get(CONF_PUSH_MODE, DEFAULT_PUSH_MODE),
+            ): bool,
+            vol.Optional(
+                CONF_REPLAY_MODE,
+                default=options.get(CONF_REPLAY_MODE, DEFAULT_REPLAY_MODE),
+            ): vol.In(REPLAY_MODES),
+            vol.Optional(
+                CONF_REPLAY_FILE,
+                description={"suggested_value": options.get(CONF_REPLAY_FILE)},
+            ): str,
+            vol.Optional(
+                CONF_REPLAY_INVERTERS,
+                default=options.get(CONF_REPLAY_INVERTERS, DEFAULT_REPLAY_INVERTERS),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+            vol.Optional(
+                CONF_REPLAY_SPEED,
+                default=options.get(CONF_REPLAY_SPEED, DEFAULT_REPLAY_SPEED),
+            ): vol.All(vol.Coerce(float), vol.Range(min=1, max=MAX_REPLAY_SPEED)),
         })
 
-        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
+        # Show where the device should post its readings once push mode is enabled
+        webhook_id = options.get(CONF_WEBHOOK_ID)
+        webhook_path = webhook.async_generate_path(webhook_id) if webhook_id else "-"
 
-    def _is_valid_url(self, url):
-        """Validate if the URL is valid."""
-        try:
-            result = urlparse(url)
-            return all([result.scheme, result.netloc])
-        except Exception:
-            return False
+        return self.async_show_form(
+            step_id="init",
+            data_schema=schema,
+            errors=errors,
+            description_placeholders={"webhook_path": webhook_path},
+        )
 
-    async def _test_connection(self, host):
-        """Test the connection with the host."""
-        _LOGGER.debug("Testing connection to: %s", host)
-
-        # For .local hosts, try IP address resolution first
-        test_url = host
-        if ".local" in host:
-            resolved_url = await resolve_mdns_url(host)
-            if resolved_url:
-                test_url = resolved_url
-                _LOGGER.debug("Resolved %s to %s", host, test_url)
-            else:
-                _LOGGER.debug("Could not resolve mDNS for %s, trying original URL", host)
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with async_timeout.timeout(10):  # Increase timeout for mDNS
-                    async with session.get(test_url) as response:
-                        _LOGGER.debug("Connection test result: status %s", response.status)
-                        return response.status < 400
-        except Exception as err:
-            _LOGGER.debug("Connection test failed: %s", err)
+    def _is_other_device(self, payload):
+        """Return True if payload comes from another Daytopper than this entry."""
+        if payload is None or self.config_entry.unique_id is None:
             return False
+        chip_id = payload["system"].get("chipId")
+        return chip_id is not None and str(chip_id) != self.config_entry.unique_id
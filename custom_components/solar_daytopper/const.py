@@ -2,10 +2,121 @@ from datetime import timedelta
 from homeassistant.helpers.entity import EntityCategory
 
 DOMAIN = "solar_daytopper"
+# hass.data key of the fleet that schedules and fetches all config entries
+DATA_FLEET = f"{DOMAIN}_fleet"
 # The Daytopper module does fetch data every 5 minutes
 # So we can also set this interval to 5 minutes as it make no sense to fetch data more often
 SCAN_INTERVAL = timedelta(seconds=300)
 
+# Adaptive polling around SCAN_INTERVAL
+# Poll just after the device has uploaded its next reading
+POLL_ALIGN_MARGIN = timedelta(seconds=15)
+MIN_SCAN_INTERVAL = timedelta(seconds=30)
+# Back off when there is nothing to measure
+NIGHT_SCAN_INTERVAL = timedelta(minutes=30)
+IDLE_SCAN_INTERVAL = timedelta(minutes=15)
+ZERO_PRODUCTION_THRESHOLD = 3
+# Exponential backoff on repeated failures, with +/- 10% jitter
+MAX_BACKOFF_INTERVAL = timedelta(hours=1)
+BACKOFF_JITTER = 0.1
+
+# HTTP client settings for the poll loop
+REQUEST_TIMEOUT = 10
+# Time the setup UI waits for any of the probed addresses of a device
+PROBE_TIMEOUT = 5
+# Devices polled at the same time, across all config entries
+MAX_CONCURRENT_FETCHES = 4
+# Polls of all devices are spread over ticks of this many seconds
+FLEET_TICK = 5
+# Keep the connection to the device open between polls
+KEEPALIVE_TIMEOUT = SCAN_INTERVAL.total_seconds() + 30
+
+# How long a resolved .local hostname is trusted before asking mDNS again
+MDNS_CACHE_TTL = 3600
+
+# Last good payload, used to set up entities before the device answers
+CACHE_STORAGE_VERSION = 1
+CACHE_SAVE_DELAY = 60
+
+# Local production history, rolled up per inverter
+# (name, bucket size in seconds, retention in seconds)
+# A year of 5 minute buckets is about 4 MB per inverter
+HISTORY_LEVELS = (
+    ("5min", 300, 366 * 86400),
+    ("hour", 3600, 2 * 365 * 86400),
+    ("day", 86400, 20 * 365 * 86400),
+)
+HISTORY_DIRECTORY = f".storage/{DOMAIN}_history"
+HISTORY_STORAGE_VERSION = 1
+# Key under which the solarReadingTotal values are stored next to the inverters
+HISTORY_TOTAL_KEY = "_total"
+# Records read per chunk when exporting history to a file
+EXPORT_CHUNK_RECORDS = 4096
+EXPORT_FORMATS = ["csv", "ndjson"]
+
+# Options to suppress state writes for small power fluctuations
+CONF_DEADBAND_WATTS = "deadband_watts"
+CONF_DEADBAND_PERCENT = "deadband_percent"
+DEFAULT_DEADBAND_WATTS = 0
+DEFAULT_DEADBAND_PERCENT = 0
+
+# Optional push mode: the device posts its readings to a webhook
+CONF_PUSH_MODE = "push_mode"
+CONF_WEBHOOK_ID = "webhook_id"
+DEFAULT_PUSH_MODE = False
+# Fall back to polling when no push arrived for this long
+PUSH_FALLBACK_INTERVAL = 2 * SCAN_INTERVAL
+
+# Replay mode: recorded or synthetic payloads instead of the device, for capacity testing
+CONF_REPLAY_MODE = "replay_mode"
+CONF_REPLAY_FILE = "replay_file"
+CONF_REPLAY_INVERTERS = "replay_inverters"
+CONF_REPLAY_SPEED = "replay_speed"
+REPLAY_OFF = "off"
+REPLAY_FILE = "file"
+REPLAY_SYNTHETIC = "synthetic"
+REPLAY_MODES = [REPLAY_OFF, REPLAY_FILE, REPLAY_SYNTHETIC]
+DEFAULT_REPLAY_MODE = REPLAY_OFF
+DEFAULT_REPLAY_INVERTERS = 10
+# Simulated seconds per real second, 60 replays a 5 minute reading every 5 seconds
+DEFAULT_REPLAY_SPEED = 60
+# The coordinator schedules on whole seconds, so a poll at most every second
+MAX_REPLAY_SPEED = int(SCAN_INTERVAL.total_seconds())
+# Peak power of a synthetic inverter at solar noon, in W
+REPLAY_PEAK_POWER = 4000
+# Event loop lag is sampled this often, in seconds
+REPLAY_LAG_SAMPLE_INTERVAL = 0.1
+REPLAY_REPORT_INTERVAL = timedelta(seconds=10)
+
+# How the timestamp fields are encoded in the Daytopper payload
+TIMESTAMP_ISO = "iso"          # 2025-08-12T16:34:14.453838
+TIMESTAMP_SIMPLE = "simple"    # 2025-08-11 07:35:06
+TIMESTAMP_UNIX = "unix"        # 1754982854
+TIMESTAMP_FORMATS = {
+    ("_last_update",): TIMESTAMP_ISO,
+    ("system", "upSince"): TIMESTAMP_SIMPLE,
+    ("system", "lastApiCall"): TIMESTAMP_UNIX,
+}
+
+# Expected kind of every known payload field, checked once per payload.
+# Invalid fields are replaced by their last good value, unknown fields are kept as is.
+PAYLOAD_SYSTEM_FIELDS = {
+    "chipId": "identifier",
+    "firmwareVersion": "text",
+    "wifiStrengthRaw": "number",
+    "wifiStrength": "text",
+    "wifiHostname": "text",
+    "upSince": "timestamp",
+    "lastApiCall": "timestamp",
+    "ip": "text",
+}
+PAYLOAD_READING_FIELDS = {
+    "current": "number",
+    "total": "counter",
+}
+# The same invalid field is reported at most once per interval
+SCHEMA_WARNING_INTERVAL = timedelta(hours=1)
+
 # Main reading sensors - primary energy data
 MAIN_SENSORS = [
     ("Solar Daytopper Current", ["solarReadingTotal", "current"], "W", "power", "measurement", 1, None),
@@ -24,8 +135,50 @@ DIAGNOSTIC_SENSORS = [
     ("Solar Daytopper Last Updated", ["_last_update"], None, "timestamp", None, 1, EntityCategory.DIAGNOSTIC),
 ]
 
+# Poll path instrumentation, exposed next to the diagnostic sensors
+POLL_HISTORY_SIZE = 100
+POLL_DIAGNOSTIC_SENSORS = [
+    ("Solar Daytopper Poll Duration", "total_p50", "ms", "duration", "measurement", 1, EntityCategory.DIAGNOSTIC),
+    ("Solar Daytopper Poll Duration P95", "total_p95", "ms", "duration", "measurement", 1, EntityCategory.DIAGNOSTIC),
+    ("Solar Daytopper Poll Successes", "successes", None, None, "total_increasing", 1, EntityCategory.DIAGNOSTIC),
+    ("Solar Daytopper Poll Failures", "failures", None, None, "total_increasing", 1, EntityCategory.DIAGNOSTIC),
+    ("Solar Daytopper Pushes Received", "pushes", None, None, "total_increasing", 1, EntityCategory.DIAGNOSTIC),
+    ("Solar Daytopper Payload Size", "size", "B", "data_size", "measurement", 1, EntityCategory.DIAGNOSTIC),
+]
+# Only created in replay mode
+REPLAY_DIAGNOSTIC_SENSORS = [
+    ("Solar Daytopper Replay Throughput", "throughput", "updates/s", None, "measurement", 1, EntityCategory.DIAGNOSTIC),
+    ("Solar Daytopper Event Loop Lag", "loop_lag", "ms", "duration", "measurement", 1, EntityCategory.DIAGNOSTIC),
+]
+
 # Template for dynamic inverter sensors
 INVERTER_SENSOR_TEMPLATE = [
     ("Current", "current", "W", "power", "measurement", 1, None),
     ("Total", "total", "kWh", "energy", "total_increasing", 1000, None),
-]
\ No newline at end of file
+]
+
+# Derived per inverter from the coordinator's running statistics:
+# (name suffix, statistic, unit, device_class, state_class, entity_category)
+INVERTER_DERIVED_SENSOR_TEMPLATE = [
+    ("Today", "today", "kWh", "energy", "total_increasing", None),
+    ("Peak Power", "peak_power", "W", "power", None, None),
+    ("Peak Time", "peak_time", None, "timestamp", None, None),
+    ("Share", "share", "%", None, "measurement", None),
+    ("Average Power", "average_power", "W", "power", "measurement", None),
+    ("Imbalance", "imbalance", None, "enum", None, None),
+]
+# The same statistics for the whole device, share and imbalance only apply to inverters
+MAIN_DERIVED_SENSORS = [
+    ("Solar Daytopper Today", "today", "kWh", "energy", "total_increasing", None),
+    ("Solar Daytopper Peak Power", "peak_power", "W", "power", None, None),
+    ("Solar Daytopper Peak Time", "peak_time", None, "timestamp", None, None),
+    ("Solar Daytopper Average Power", "average_power", "W", "power", "measurement", None),
+]
+ROLLING_AVERAGE_WINDOW = timedelta(minutes=15)
+# An inverter producing less than this part of the average inverter is reported as low
+IMBALANCE_THRESHOLD = 0.5
+
+# Gap-filled energy per inverter, integrated from power and reconciled with the device total
+INVERTER_ENERGY_SENSOR = ("Energy", "kWh", "energy", "total_increasing")
+# Longer gaps between readings are not interpolated from power
+MAX_INTEGRATION_GAP = 3 * SCAN_INTERVAL
\ No newline at end of file
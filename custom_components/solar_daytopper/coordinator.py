@@ -0,0 +1,273 @@
+"""Data update coordinator for Solar Daytopper."""
+import aiohttp
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import DOMAIN, SCAN_INTERVAL, PUSH_FALLBACK_INTERVAL
+from .analytics import RunningStats, imbalance
+from .energy import EnergyAccumulator
+from .metrics import PollMetrics
+from .scheduler import PollScheduler, current_production
+from .schema import PayloadSchema
+from .utils import as_number, sample_timestamp
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DaytopperSnapshot:
+    """Decoded view of a single Daytopper payload, shared by all entities."""
+
+    __slots__ = ("data", "chip_id", "firmware_version", "inverters", "inverter_set", "values")
+
+    def __init__(self, data, chip_id, firmware_version, inverters, values):
+        self.data = data
+        self.chip_id = chip_id
+        self.firmware_version = firmware_version
+        self.inverters = inverters
+        self.inverter_set = frozenset(inverters)
+        self.values = values
+
+    @classmethod
+    def decode(cls, data, extractors):
+        """Decode data once, running every registered extractor."""
+        if not isinstance(data, dict):
+            return cls(data, None, None, (), {key: None for key in extractors})
+
+        system = data.get("system")
+        if not isinstance(system, dict):
+            system = {}
+        solar_readings = data.get("solarReadings")
+        inverters = tuple(solar_readings) if isinstance(solar_readings, dict) else ()
+
+        return cls(
+            data,
+            system.get("chipId"),
+            system.get("firmwareVersion"),
+            inverters,
+            {key: extract(data) for key, extract in extractors.items()},
+        )
+
+
+class DaytopperCoordinator(DataUpdateCoordinator):
+    """Fetch the Daytopper API and decode each payload once for all entities."""
+
+    def __init__(self, hass, host, fetcher, fleet=None, scheduler=None):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=SCAN_INTERVAL,
+            # Unchanged payloads are returned as the same object, skip the fan-out for them
+            always_update=False,
+        )
+        self.host = host
+        self._fetcher = fetcher
+        # Polls are timed by the fleet when given, otherwise by the coordinator itself
+        self._fleet = fleet
+        self._prefetch = None
+        # Timings of the poll whose payload the next fan-out writes
+        self._update_timings = None
+        self._scheduler = scheduler or PollScheduler(hass)
+        self._schema = PayloadSchema(host)
+        self._extractors = {}
+        self.snapshot = DaytopperSnapshot.decode(None, self._extractors)
+        self.energy_accumulators = {}
+        # Derived statistics per inverter, None for the whole device
+        self.stats = {}
+        # Every inverter seen so far, also the ones missing from the latest payload
+        self.known_inverters = {}
+        self.metrics = PollMetrics()
+
+    @callback
+    def async_get_energy_accumulator(self, inverter):
+        """Return the energy accumulator of inverter, fed on every update."""
+        accumulator = self.energy_accumulators.get(inverter)
+        if accumulator is None:
+            accumulator = self.energy_accumulators[inverter] = EnergyAccumulator(inverter)
+            self._update_energy(accumulator, self.data)
+        return accumulator
+
+    @callback
+    def async_get_stats(self, inverter=None):
+        """Return the running statistics of inverter, or of the whole device."""
+        stats = self.stats.get(inverter)
+        if stats is None:
+            stats = self.stats[inverter] = RunningStats(inverter)
+            self._update_stats({inverter: stats}, self.data)
+        return stats
+
+    @callback
+    def async_restore(self, data, inverters):
+        """Start from a cached payload instead of a live one.
+
+        The entities are set up from it, but stay unavailable until the device answers.
+        """
+        self.data = data
+        self.last_update_success = False
+        self.known_inverters.update(dict.fromkeys(inverters))
+        self.snapshot = DaytopperSnapshot.decode(data, self._extractors)
+        self.known_inverters.update(dict.fromkeys(self.snapshot.inverters))
+
+    @callback
+    def async_register_value(self, key, extractor):
+        """Register an extractor whose result is decoded on every update."""
+        self._extractors[key] = extractor
+        self.snapshot.values[key] = extractor(self.data)
+
+    async def _async_update_data(self):
+        api_url = self.host
+        _LOGGER.debug("Fetching data from: %s", api_url)
+
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is not None:
+            timings, fetch = prefetch
+        else:
+            timings = self.metrics.start_poll()
+            fetch = self._fetcher.async_fetch(api_url, timings)
+        try:
+            data = await fetch
+        except asyncio.TimeoutError as err:
+            raise self._fetch_failed(timings, f"Timeout while fetching data from Daytopper API ({api_url})") from err
+        except aiohttp.ClientError as err:
+            raise self._fetch_failed(timings, f"HTTP error fetching data from Daytopper API ({api_url}): {err}") from err
+        except Exception as err:
+            raise self._fetch_failed(timings, f"Unexpected error fetching data from Daytopper API ({api_url}): {err}") from err
+
+        if not isinstance(data, dict):
+            raise self._fetch_failed(timings, f"Unexpected payload from Daytopper API ({api_url}): {type(data).__name__}")
+
+        if data is self.data:
+            # Nothing new, entities are not updated so only the poll sensors are
+            self.metrics.record(timings, True)
+            self.metrics.async_notify()
+        else:
+            if not self._schema.validate(data):
+                raise self._fetch_failed(timings, f"Unexpected payload from Daytopper API ({api_url}): no known fields")
+            self.metrics.record(timings, True)
+            self._update_timings = timings
+            # Add timestamp when data was fetched
+            data["_last_update"] = datetime.now().isoformat()
+
+        _LOGGER.debug("Successfully fetched data: %s keys", list(data.keys()))
+        if self._scheduler.failures:
+            _LOGGER.info("Daytopper API (%s) is reachable again after %d failed attempt(s)", api_url, self._scheduler.failures)
+        self.update_interval = self._scheduler.next_after_success(data)
+        _LOGGER.debug("Next poll in %s", self.update_interval)
+        return data
+
+    @callback
+    def async_prefetch(self):
+        """Start fetching the payload for the next refresh, return the fetch task."""
+        timings = self.metrics.start_poll()
+        task = self.hass.async_create_task(self._fetcher.async_fetch(self.host, timings))
+        self._prefetch = (timings, task)
+        return task
+
+    @callback
+    def _schedule_refresh(self):
+        if self._fleet is None:
+            super()._schedule_refresh()
+        elif self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        elif self.update_interval is not None:
+            self._fleet.async_schedule(self, self.update_interval)
+
+    @callback
+    def _async_unsub_refresh(self):
+        super()._async_unsub_refresh()
+        if self._fleet is not None:
+            self._fleet.async_cancel(self)
+
+    @callback
+    def async_push(self, data, size=None):
+        """Take a reading pushed by the device and postpone the next poll.
+
+        Polling only resumes when no push arrives within PUSH_FALLBACK_INTERVAL.
+        Returns False if the reading is not usable.
+        """
+        if not self._schema.validate(data):
+            return False
+        data["_last_update"] = datetime.now().isoformat()
+        # The next poll must not mistake the polled payload for the current one
+        self._fetcher.forget(self.host)
+        self.metrics.record_push(size)
+        # A pushed reading is not one of the recorded polls
+        self._update_timings = None
+        self.update_interval = PUSH_FALLBACK_INTERVAL
+        self.async_set_updated_data(data)
+        return True
+
+    def _fetch_failed(self, timings, message):
+        """Back off after a failed fetch and return the error to raise.
+
+        The coordinator logs an UpdateFailed only once per outage, so a device
+        that is offline for the night does not flood the log.
+        """
+        self.metrics.record(timings, False, message)
+        # Listeners are only called on the first failure of an outage
+        self.metrics.async_notify()
+        self.update_interval = self._scheduler.next_after_failure()
+        _LOGGER.debug("%s, retrying in %s (attempt %d)", message, self.update_interval, self._scheduler.failures)
+        return UpdateFailed(message)
+
+    @callback
+    def async_update_listeners(self):
+        """Decode the new payload once, then fan out to the entities."""
+        started = time.perf_counter()
+        if self.snapshot.data is not self.data:
+            self.snapshot = DaytopperSnapshot.decode(self.data, self._extractors)
+            self.known_inverters.update(dict.fromkeys(self.snapshot.inverters))
+            for accumulator in self.energy_accumulators.values():
+                self._update_energy(accumulator, self.data)
+            self._update_stats(self.stats, self.data)
+        super().async_update_listeners()
+        timings, self._update_timings = self._update_timings, None
+        self.metrics.record_fan_out(timings, time.perf_counter() - started)
+        self.metrics.async_notify()
+
+    @staticmethod
+    def _update_energy(accumulator, data):
+        if not isinstance(data, dict):
+            return
+        readings = data.get("solarReadings")
+        reading = readings.get(accumulator.name) if isinstance(readings, dict) else None
+        if not isinstance(reading, dict):
+            return
+        system = data.get("system") if isinstance(data.get("system"), dict) else {}
+        accumulator.update(
+            sample_timestamp(data),
+            reading.get("current"),
+            reading.get("total"),
+            system.get("upSince"),
+        )
+
+    @staticmethod
+    def _update_stats(stats, data):
+        if not isinstance(data, dict) or not stats:
+            return
+        readings = data.get("solarReadings")
+        if not isinstance(readings, dict):
+            readings = {}
+        total_reading = data.get("solarReadingTotal")
+        if not isinstance(total_reading, dict):
+            total_reading = {}
+        total_power = current_production(data)
+        timestamp = sample_timestamp(data)
+
+        for inverter, inverter_stats in stats.items():
+            if inverter is None:
+                inverter_stats.update(timestamp, total_power, total_reading.get("total"))
+                continue
+            reading = readings.get(inverter)
+            if not isinstance(reading, dict):
+                continue
+            power = reading.get("current")
+            inverter_stats.update(timestamp, power, reading.get("total"))
+            if as_number(power) is not None:
+                inverter_stats.share = round(power / total_power * 100, 1) if total_power else None
+                inverter_stats.imbalance = imbalance(power, total_power, len(readings))
@@ -0,0 +1,21 @@
+"""Diagnostics support for Solar Daytopper."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_FLEET
+
+TO_REDACT = {"host", "ip", "chipId", "wifiHostname", "unique_id", "webhook_id"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return the poll timings and the last payload of an entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "update_interval": str(coordinator.update_interval),
+        "next_poll_in": hass.data[DATA_FLEET].next_poll(coordinator),
+        "last_update_success": coordinator.last_update_success,
+        "poll": coordinator.metrics.as_dict(),
+        "data": async_redact_data(coordinator.data, TO_REDACT),
+    }
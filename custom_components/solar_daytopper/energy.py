@@ -0,0 +1,160 @@
+"""Gap-aware energy accounting per inverter."""
+import logging
+
+from .const import MAX_INTEGRATION_GAP
+from .utils import WH_PER_KWH, as_number
+
+_LOGGER = logging.getLogger(__name__)
+
+# Power is reported in W
+SECONDS_PER_HOUR = 3600
+
+
+class EnergyCounter:
+    """High-water mark of a device energy counter in Wh.
+
+    A reading below the mark is held back instead of lowering the mark, so a
+    single 0 does not make the whole lifetime counter count again once it
+    recovers. If a later reading is above the mark, only the delta from the mark
+    counts. If it stays below and goes up, the counter was reset and counting
+    continues from the held back reading.
+    """
+
+    def __init__(self, mark=None):
+        self.mark = mark
+        self.held = None
+
+    def update(self, total):
+        """Return the Wh added by total, or None if there is no usable delta."""
+        if self.mark is None:
+            self.mark = total
+            return None
+        if total >= self.mark:
+            delta = total - self.mark
+        elif self.held is not None and total > self.held:
+            _LOGGER.debug("Counter reset from %s Wh, continuing from %s Wh", self.mark, self.held)
+            delta = total - self.held
+        else:
+            self.held = total
+            return None
+        self.mark = total
+        self.held = None
+        return delta
+
+    def reset(self, total):
+        """Start over from total, e.g. after the device rebooted."""
+        self.mark = total
+        self.held = None
+
+
+class EnergyAccumulator:
+    """Accumulate the energy of one inverter in kWh.
+
+    While the device counter runs normally, its delta is used as is, which
+    also covers any gap between readings. When the counter resets (the device
+    rebooted), drops or is missing, the power readings are integrated with the
+    trapezoidal rule instead, as long as the gap is short enough to do so.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.energy = 0.0
+        self.last_timestamp = None
+        self.last_power = None
+        self.counter = EnergyCounter()
+        self.up_since = None
+        self._first_sample = None
+        # Energy integrated from power since the counter last moved forward
+        self._bridged = 0.0
+
+    def update(self, timestamp, power, total, up_since):
+        """Add a new reading, return True if the energy changed."""
+        power = as_number(power)
+        total = as_number(total)
+
+        if self.last_timestamp is None:
+            self._first_sample = (timestamp, power, total, up_since)
+            if total is not None:
+                self.counter.update(total)
+            self._set_last(timestamp, power, up_since)
+            return False
+
+        elapsed = timestamp - self.last_timestamp
+        if elapsed <= 0:
+            # Same reading as before
+            return False
+
+        rebooted = up_since is not None and self.up_since is not None and up_since != self.up_since
+
+        delta = None
+        from_mark = False
+        if total is not None and not rebooted:
+            from_mark = self.counter.mark is not None and total >= self.counter.mark
+            delta = self.counter.update(total)
+
+        added = 0.0
+        if delta is not None:
+            added = delta / WH_PER_KWH
+            if from_mark:
+                # Part of it was already integrated from power while the counter stood still
+                added = max(added - self._bridged, 0.0)
+            self._bridged = 0.0
+        elif elapsed <= MAX_INTEGRATION_GAP.total_seconds() and power is not None and self.last_power is not None:
+            added = (self.last_power + power) / 2 * elapsed / SECONDS_PER_HOUR / WH_PER_KWH
+            self._bridged += added
+        elif rebooted and total is not None:
+            # Long outage around a reboot: only the new counter is known
+            added = total / WH_PER_KWH
+            _LOGGER.debug("%s: counter reset after %ss gap, counting %s kWh since reboot", self.name, elapsed, added)
+        else:
+            _LOGGER.debug("%s: skipping %ss gap without usable counter", self.name, elapsed)
+
+        if rebooted and total is not None:
+            self.counter.reset(total)
+            self._bridged = 0.0
+        self._set_last(timestamp, power, up_since)
+        if added <= 0:
+            return False
+        self.energy += added
+        return True
+
+    def restore(self, state):
+        """Restore a stored state and account for the gap until the first reading."""
+        first_sample = self._first_sample
+        accumulated = self.energy
+        latest = (self.last_timestamp, self.last_power, self.up_since)
+        counter = self.counter
+
+        self.energy = float(state.get("energy") or 0.0)
+        self.last_timestamp = as_number(state.get("last_timestamp"))
+        self.last_power = as_number(state.get("last_power"))
+        self.counter = EnergyCounter(as_number(state.get("last_total")))
+        self.up_since = state.get("up_since")
+        if first_sample is None or self.last_timestamp is None:
+            self.energy += accumulated
+            if latest[0] is not None:
+                self._set_last(*latest)
+                self.counter = counter
+            return
+
+        # Bridge the restart, then re-apply what was counted since
+        self.update(*first_sample)
+        self.energy += accumulated
+        self._set_last(*latest)
+        # Keep the stored mark if the live counter started below it
+        if counter.mark is not None and (self.counter.mark is None or counter.mark >= self.counter.mark):
+            self.counter = counter
+
+    def as_dict(self):
+        return {
+            "energy": self.energy,
+            "last_timestamp": self.last_timestamp,
+            "last_power": self.last_power,
+            "last_total": self.counter.mark,
+            "up_since": self.up_since,
+        }
+
+    def _set_last(self, timestamp, power, up_since):
+        self.last_timestamp = timestamp
+        self.last_power = power if power is not None else self.last_power
+        self.up_since = up_since if up_since is not None else self.up_since
@@ -0,0 +1,117 @@
+"""Compiled value extractors for Solar Daytopper sensors.
+
+Every sensor spec is turned into a small function once at setup, so reading
+a value does not have to inspect the path or device class again.
+"""
+import logging
+from datetime import datetime
+
+from homeassistant.util import dt as dt_util
+
+from .const import TIMESTAMP_FORMATS, TIMESTAMP_ISO, TIMESTAMP_SIMPLE, TIMESTAMP_UNIX
+from .utils import as_number
+
+_LOGGER = logging.getLogger(__name__)
+
+SIMPLE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def compile_getter(path):
+    """Return a function that walks path in a payload dict."""
+    keys = tuple(path)
+
+    if len(keys) == 1:
+        (key,) = keys
+
+        def getter(data):
+            return data.get(key) if isinstance(data, dict) else None
+
+        return getter
+
+    def getter(data):
+        for key in keys:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(key)
+        return data
+
+    return getter
+
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value)
+
+
+def _parse_simple(value):
+    return datetime.strptime(value, SIMPLE_TIMESTAMP_FORMAT)
+
+
+def _parse_unix(value):
+    return datetime.fromtimestamp(value)
+
+
+def _parse_any(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.strptime(value, SIMPLE_TIMESTAMP_FORMAT)
+
+
+TIMESTAMP_PARSERS = {
+    TIMESTAMP_ISO: _parse_iso,
+    TIMESTAMP_SIMPLE: _parse_simple,
+    TIMESTAMP_UNIX: _parse_unix,
+}
+
+
+def _timestamp_extractor(getter, parser, name):
+    def extract(data):
+        raw = getter(data)
+        if not raw:
+            return None
+        try:
+            dt = parser(raw)
+        except (ValueError, TypeError, AttributeError, OSError, OverflowError) as err:
+            # Invalid timestamps are already reported by the payload schema
+            _LOGGER.debug("Error parsing timestamp %s for %s: %s", raw, name, err)
+            return None
+        # If no timezone info, assume local timezone
+        if dt.tzinfo is None:
+            dt = dt_util.as_local(dt)
+        return dt
+
+    return extract
+
+
+def _numeric_extractor(getter, multiplier):
+    def extract(data):
+        value = as_number(getter(data))
+        if value is None:
+            return None
+        return value / multiplier if multiplier else value
+
+    return extract
+
+
+def _string_extractor(getter):
+    def extract(data):
+        value = getter(data)
+        if isinstance(value, (dict, list)):
+            return None
+        return value
+
+    return extract
+
+
+def compile_extractor(name, path, unit, device_class, state_class, multiplier):
+    """Compile a sensor spec into a function that returns its value from a payload."""
+    getter = compile_getter(path)
+
+    if device_class == "timestamp":
+        parser = TIMESTAMP_PARSERS.get(TIMESTAMP_FORMATS.get(tuple(path)), _parse_any)
+        return _timestamp_extractor(getter, parser, name)
+
+    if unit is not None or state_class is not None:
+        return _numeric_extractor(getter, multiplier)
+
+    return _string_extractor(getter)
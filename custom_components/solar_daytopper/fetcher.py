@@ -0,0 +1,142 @@
+"""Shared HTTP fetcher for all configured Solar Daytopper devices."""
+import aiohttp
+import asyncio
+import hashlib
+import logging
+import re
+import time
+
+from homeassistant.core import callback
+from homeassistant.util.json import json_loads
+
+from .const import REQUEST_TIMEOUT, KEEPALIVE_TIMEOUT, MAX_CONCURRENT_FETCHES
+from .utils import MdnsResolver
+
+_LOGGER = logging.getLogger(__name__)
+
+# Found without decoding, the device only uploads a new reading when it changes
+_LAST_API_CALL = re.compile(rb'"lastApiCall"\s*:\s*("[^"]*"|[^,}\s]+)')
+
+
+class DaytopperFetcher:
+    """Fetch Daytopper payloads over one connection pool with a concurrency limit.
+
+    Every host gets its own timeout that only starts once a fetch slot is
+    free, so one slow or offline device does not delay the others.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_FETCHES, timeout=REQUEST_TIMEOUT):
+        # Time new connections, a reused keep-alive connection costs nothing
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_start.append(_on_connection_create_start)
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=max_concurrent,
+                limit_per_host=1,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ),
+            trace_configs=[trace_config],
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._timeout = timeout
+        self.resolver = MdnsResolver()
+        # Validators and last payload per host, to recognize unchanged data
+        self._previous = {}
+
+    async def async_fetch(self, host, timings=None):
+        """Fetch and decode the payload of host.
+
+        When the device reports the data did not change since the previous
+        fetch, the previous payload object is returned without decoding.
+        The duration of every phase is added to timings, if given.
+        Raises asyncio.TimeoutError, aiohttp.ClientError or ValueError on failure.
+        """
+        if timings is None:
+            timings = {}
+        previous = self._previous.get(host)
+
+        headers = {}
+        if previous is not None:
+            if previous["etag"]:
+                headers["If-None-Match"] = previous["etag"]
+            if previous["last_modified"]:
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        async with self._semaphore:
+            try:
+                # The timeout also covers the resolution, an offline .local host can block for long
+                async with asyncio.timeout(self._timeout):
+                    # Resolve mDNS if needed, cached between polls
+                    started = time.perf_counter()
+                    fetch_url = await self.resolver.async_resolve(host)
+                    timings["resolve"] = _elapsed_ms(started)
+                    if fetch_url != host:
+                        _LOGGER.debug("Using resolved URL: %s", fetch_url)
+
+                    started = time.perf_counter()
+                    async with self._session.get(fetch_url, headers=headers, trace_request_ctx=timings) as response:
+                        _LOGGER.debug("Received response from %s with status: %s", fetch_url, response.status)
+                        response.raise_for_status()
+                        body = await response.read()
+                        not_modified = response.status == 304
+                        etag = response.headers.get("ETag")
+                        last_modified = response.headers.get("Last-Modified")
+                    # Time to the last byte, without setting up the connection
+                    timings["response"] = _elapsed_ms(started) - timings.get("connect", 0.0)
+            except Exception:
+                self.resolver.invalidate(host)
+                raise
+
+        timings["size"] = len(body)
+        if not_modified and previous is not None:
+            _LOGGER.debug("Data of %s not modified", host)
+            timings["unchanged"] = True
+            return previous["data"]
+
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        match = _LAST_API_CALL.search(body)
+        last_api_call = match.group(1) if match else None
+        if previous is not None and (
+            digest == previous["digest"]
+            or (last_api_call is not None and last_api_call == previous["last_api_call"])
+        ):
+            _LOGGER.debug("Data of %s unchanged since the previous fetch", host)
+            timings["unchanged"] = True
+            return previous["data"]
+
+        started = time.perf_counter()
+        data = json_loads(body)
+        timings["decode"] = _elapsed_ms(started)
+        if isinstance(data, dict):
+            self._previous[host] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "digest": digest,
+                "last_api_call": last_api_call,
+                "data": data,
+            }
+        return data
+
+    @callback
+    def forget(self, host):
+        """Drop what is known about host, the next fetch downloads everything."""
+        self._previous.pop(host, None)
+
+    async def async_close(self):
+        """Close the shared connection pool."""
+        await self._session.close()
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+async def _on_connection_create_start(session, context, params):
+    context.connect_started = time.perf_counter()
+
+
+async def _on_connection_create_end(session, context, params):
+    if context.trace_request_ctx is not None:
+        context.trace_request_ctx["connect"] = _elapsed_ms(context.connect_started)
@@ -0,0 +1,106 @@
+"""Central poll scheduling for all configured Solar Daytopper devices."""
+import asyncio
+import logging
+import math
+from collections import Counter
+
+from homeassistant.core import callback
+
+from .const import SCAN_INTERVAL, FLEET_TICK
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DaytopperFleet:
+    """Poll every configured device from one timer and one connection pool.
+
+    Time is divided into ticks of FLEET_TICK seconds, and a tick takes at most
+    its share of the devices. Coordinators that want to poll at the same moment
+    are spread over the following ticks instead of all hitting the network at once.
+    The payloads of one tick are fetched concurrently, then the coordinators update
+    their entities back to back, so the state writes of a tick land together.
+    """
+
+    def __init__(self, hass, fetcher):
+        self._hass = hass
+        self.fetcher = fetcher
+        # Tick in which each coordinator polls next
+        self._due = {}
+        self._timer = None
+        self._timer_tick = None
+        # Config entries using this fleet
+        self.users = set()
+
+    @callback
+    def async_schedule(self, coordinator, delay):
+        """Poll coordinator after delay, in the first tick that has room for it."""
+        self._due.pop(coordinator, None)
+        capacity = math.ceil((len(self._due) + 1) * FLEET_TICK / SCAN_INTERVAL.total_seconds())
+        load = Counter(self._due.values())
+        tick = math.ceil((self._hass.loop.time() + delay.total_seconds()) / FLEET_TICK)
+        while load[tick] >= capacity:
+            tick += 1
+        self._due[coordinator] = tick
+        self._async_arm()
+
+    @callback
+    def async_cancel(self, coordinator):
+        """Stop polling coordinator until it is scheduled again."""
+        if self._due.pop(coordinator, None) is not None:
+            self._async_arm()
+
+    def next_poll(self, coordinator):
+        """Return the seconds until coordinator is polled, or None if not scheduled."""
+        tick = self._due.get(coordinator)
+        if tick is None:
+            return None
+        return max(0.0, tick * FLEET_TICK - self._hass.loop.time())
+
+    @callback
+    def async_shutdown(self):
+        self._due.clear()
+        self._async_stop_timer()
+
+    @callback
+    def _async_arm(self):
+        """Make sure the timer fires for the earliest tick with a poll, if any."""
+        if not self._due:
+            self._async_stop_timer()
+            return
+        tick = min(self._due.values())
+        if self._timer is not None:
+            if self._timer_tick == tick:
+                return
+            # A cancelled or rescheduled device leaves its old tick behind
+            self._timer.cancel()
+        self._timer_tick = tick
+        self._timer = self._hass.loop.call_at(tick * FLEET_TICK, self._async_run_tick)
+
+    @callback
+    def _async_stop_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @callback
+    def _async_run_tick(self):
+        self._timer = None
+        batch = [coordinator for coordinator, tick in self._due.items() if tick <= self._timer_tick]
+        for coordinator in batch:
+            del self._due[coordinator]
+        self._async_arm()
+        if not batch:
+            return
+        _LOGGER.debug("Polling %d device(s), %d scheduled", len(batch), len(self._due))
+        self._hass.async_create_background_task(self._async_poll(batch), "solar_daytopper fleet poll")
+
+    async def _async_poll(self, batch):
+        if not batch:
+            return
+        # 1. Fetch all payloads of the tick, limited by the fetcher concurrency
+        fetches = [coordinator.async_prefetch() for coordinator in batch]
+        await asyncio.wait(fetches)
+
+        # 2. Update the entities of all devices without yielding in between
+        for coordinator in batch:
+            await coordinator.async_refresh()
@@ -0,0 +1,443 @@
+"""Compact local production history for Solar Daytopper.
+
+Every inverter sample is rolled up into 5 minute, hourly and daily buckets.
+Closed buckets are appended as fixed-size binary records to one file per
+level, so a time range can be found with a binary search instead of a scan.
+"""
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import shutil
+import struct
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    HISTORY_LEVELS,
+    HISTORY_DIRECTORY,
+    HISTORY_STORAGE_VERSION,
+    HISTORY_TOTAL_KEY,
+    EXPORT_CHUNK_RECORDS,
+)
+from .energy import EnergyCounter
+from .utils import WH_PER_KWH, as_number, sample_timestamp
+
+_LOGGER = logging.getLogger(__name__)
+
+# bucket start, inverter id, sample count, sum of current, max current, first total, last total
+RECORD = struct.Struct("<IHHdfdd")
+EXPORT_FIELDS = ("start", "inverter", "average_power", "max_power", "energy", "samples")
+
+LEVEL_SECONDS = {name: seconds for name, seconds, _ in HISTORY_LEVELS}
+
+
+def bucket_start(level, timestamp):
+    """Return the start of the bucket of level that contains timestamp."""
+    if level == "day":
+        # Days follow the local calendar, not UTC
+        local = dt_util.as_local(dt_util.utc_from_timestamp(timestamp))
+        return int(dt_util.start_of_local_day(local).timestamp())
+    seconds = LEVEL_SECONDS[level]
+    return int(timestamp - timestamp % seconds)
+
+
+def extract_samples(data):
+    """Yield (name, current, total) for every inverter and the overall total."""
+    if not isinstance(data, dict):
+        return
+    readings = data.get("solarReadings")
+    if isinstance(readings, dict):
+        for name, reading in readings.items():
+            sample = _sample(reading)
+            if sample is not None:
+                yield (name, *sample)
+    sample = _sample(data.get("solarReadingTotal"))
+    if sample is not None:
+        yield (HISTORY_TOTAL_KEY, *sample)
+
+
+def _sample(reading):
+    if not isinstance(reading, dict):
+        return None
+    current = as_number(reading.get("current"))
+    total = as_number(reading.get("total"))
+    if current is None:
+        return None
+    if total is None:
+        total = math.nan
+    return current, total
+
+
+class _Bucket:
+    """Aggregate of the samples of one inverter in one bucket."""
+
+    __slots__ = ("start", "count", "sum_current", "max_current", "first_total", "last_total")
+
+    def __init__(self, start, current, total):
+        self.start = start
+        self.count = 1
+        self.sum_current = current
+        self.max_current = current
+        self.first_total = total
+        self.last_total = total
+
+    def add(self, current, total):
+        self.count += 1
+        self.sum_current += current
+        if current > self.max_current:
+            self.max_current = current
+        if not math.isnan(total):
+            if math.isnan(self.first_total):
+                self.first_total = total
+            self.last_total = total
+
+    def merge(self, other):
+        """Merge a bucket with the same start, e.g. one flushed before a restart."""
+        self.count += other.count
+        self.sum_current += other.sum_current
+        self.max_current = max(self.max_current, other.max_current)
+        if math.isnan(self.first_total):
+            self.first_total = other.first_total
+        if not math.isnan(other.last_total):
+            self.last_total = other.last_total
+
+    def pack(self, inverter_id):
+        return RECORD.pack(
+            self.start,
+            inverter_id,
+            min(self.count, 0xFFFF),
+            self.sum_current,
+            self.max_current,
+            self.first_total,
+            self.last_total,
+        )
+
+    @classmethod
+    def unpack(cls, record):
+        start, inverter_id, count, sum_current, max_current, first_total, last_total = record
+        bucket = cls(start, 0, first_total)
+        bucket.count = count
+        bucket.sum_current = sum_current
+        bucket.max_current = max_current
+        bucket.last_total = last_total
+        return inverter_id, bucket
+
+
+def _bisect(handle, count, value):
+    """Return the index of the first record of handle with bucket start >= value."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        handle.seek(middle * RECORD.size)
+        if struct.unpack("<I", handle.read(4))[0] < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _read_range(path, start, end):
+    """Read the records of path with start <= bucket start < end."""
+    return list(itertools.chain.from_iterable(_iter_range(path, start, end)))
+
+
+def _iter_range(path, start, end, chunk_records=EXPORT_CHUNK_RECORDS):
+    """Yield the records of path with start <= bucket start < end, a chunk at a time."""
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return
+
+    with handle:
+        count = os.fstat(handle.fileno()).st_size // RECORD.size
+        first = _bisect(handle, count, start)
+        handle.seek(first * RECORD.size)
+        for index in range(first, count, chunk_records):
+            chunk = handle.read(min(chunk_records, count - index) * RECORD.size)
+            records = list(RECORD.iter_unpack(chunk))
+            yield [record for record in records if record[0] < end]
+            if records[-1][0] >= end:
+                return
+
+
+def _iter_rows(path, start, end, names, wanted, open_records):
+    """Yield one export row per inverter and bucket, in time order.
+
+    Records of the same bucket are merged, e.g. a bucket flushed before a
+    restart and the rest of it, so only one bucket start is kept in memory.
+    """
+    counters = {}
+    group_start = None
+    group = {}
+
+    def flush():
+        for inverter_id in sorted(group):
+            counter = counters.setdefault(inverter_id, EnergyCounter())
+            row = _bucket_row(group[inverter_id], counter)
+            yield {"start": row.pop("start"), "inverter": names.get(inverter_id, str(inverter_id)), **row}
+
+    # Open buckets are newer than anything on disk
+    for records in itertools.chain(_iter_range(path, start, end), [open_records]):
+        for record in records:
+            inverter_id, bucket = _Bucket.unpack(record)
+            if wanted is not None and inverter_id != wanted:
+                continue
+            if bucket.start != group_start:
+                yield from flush()
+                group_start = bucket.start
+                group = {}
+            existing = group.get(inverter_id)
+            if existing is None:
+                group[inverter_id] = bucket
+            else:
+                existing.merge(bucket)
+    yield from flush()
+
+
+def _export(source, destination, export_format, start, end, names, wanted, open_records):
+    """Write the rows of source to destination, return the number of rows."""
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    temporary = f"{destination}.tmp"
+    rows = 0
+    with open(temporary, "w", newline="", encoding="utf-8") as handle:
+        if export_format == "csv":
+            writer = csv.DictWriter(handle, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda row: handle.write(json.dumps(row) + "\n")
+        for row in _iter_rows(source, start, end, names, wanted, open_records):
+            write(row)
+            rows += 1
+    os.replace(temporary, destination)
+    return rows
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _append(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as handle:
+        handle.write(payload)
+
+
+def _prune(path, cutoff):
+    """Drop the records of path older than cutoff."""
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+
+    with handle:
+        count = os.fstat(handle.fileno()).st_size // RECORD.size
+        keep = _bisect(handle, count, cutoff)
+        if keep == 0:
+            return 0
+        # Copy the rest a chunk at a time instead of reading the whole file
+        handle.seek(keep * RECORD.size)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as output:
+            shutil.copyfileobj(handle, output, EXPORT_CHUNK_RECORDS * RECORD.size)
+    os.replace(temporary, path)
+    return keep
+
+
+class HistoryStore:
+    """Per-entry production history with automatic roll-ups and retention."""
+
+    def __init__(self, hass, entry_id):
+        self._hass = hass
+        self._entry_id = entry_id
+        self._store = Store(hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.history.{entry_id}")
+        self._inverter_ids = {}
+        self._open = {level: {} for level, _, _ in HISTORY_LEVELS}
+        self._last_timestamp = None
+        self._last_data = None
+        self._write_lock = asyncio.Lock()
+        self._pending = set()
+
+    def path(self, level):
+        return self._hass.config.path(HISTORY_DIRECTORY, f"{self._entry_id}_{level}.bin")
+
+    @property
+    def inverters(self):
+        return list(self._inverter_ids)
+
+    async def async_load(self):
+        """Load the inverter index and apply retention."""
+        stored = await self._store.async_load()
+        if stored:
+            self._inverter_ids = {name: index for index, name in enumerate(stored["inverters"])}
+        await self.async_prune()
+
+    async def async_prune(self):
+        """Drop records that are older than the retention of their level."""
+        now = time.time()
+        async with self._write_lock:
+            for level, _, retention in HISTORY_LEVELS:
+                removed = await self._hass.async_add_executor_job(_prune, self.path(level), now - retention)
+                if removed:
+                    _LOGGER.debug("Pruned %d %s history record(s)", removed, level)
+
+    @callback
+    def async_record(self, data):
+        """Add the samples of a new payload to the open buckets."""
+        if data is self._last_data:
+            return
+        self._last_data = data
+
+        timestamp = sample_timestamp(data)
+        if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+            # No new reading since the previous poll, or the device clock jumped back
+            return
+        self._last_timestamp = timestamp
+
+        samples = [(self._inverter_id(name), current, total) for name, current, total in extract_samples(data)]
+
+        closed = {}
+        for level, _, _ in HISTORY_LEVELS:
+            start = bucket_start(level, timestamp)
+            buckets = self._open[level]
+            # Close every older bucket, also of inverters missing from this payload,
+            # so records are always appended in time order
+            for inverter_id, bucket in list(buckets.items()):
+                if bucket.start != start:
+                    closed.setdefault(level, []).append(bucket.pack(inverter_id))
+                    del buckets[inverter_id]
+            for inverter_id, current, total in samples:
+                bucket = buckets.get(inverter_id)
+                if bucket is None:
+                    buckets[inverter_id] = _Bucket(start, current, total)
+                else:
+                    bucket.add(current, total)
+
+        if closed:
+            self._track(self._async_write(closed))
+            if "day" in closed:
+                self._track(self.async_prune())
+
+    async def async_close(self):
+        """Flush the open buckets, they are merged again when read back."""
+        closed = {}
+        for level, buckets in self._open.items():
+            for inverter_id, bucket in buckets.items():
+                closed.setdefault(level, []).append(bucket.pack(inverter_id))
+            buckets.clear()
+        if closed:
+            self._track(self._async_write(closed))
+        if self._pending:
+            await asyncio.gather(*self._pending)
+
+    async def async_remove(self):
+        """Delete all history of this entry."""
+        for level, _, _ in HISTORY_LEVELS:
+            await self._hass.async_add_executor_job(_remove, self.path(level))
+        await self._store.async_remove()
+
+    async def async_query(self, level, start, end, inverter=None):
+        """Return aggregated buckets per inverter for start <= bucket < end."""
+        start_ts = bucket_start(level, dt_util.as_timestamp(start))
+        end_ts = int(dt_util.as_timestamp(end))
+        records = await self._hass.async_add_executor_job(_read_range, self.path(level), start_ts, end_ts)
+
+        names = {index: name for name, index in self._inverter_ids.items()}
+        wanted = None if inverter is None else self._inverter_ids.get(inverter, -1)
+
+        merged = {}
+        for record in records:
+            inverter_id, bucket = _Bucket.unpack(record)
+            if wanted is None or inverter_id == wanted:
+                _merge_into(merged, inverter_id, bucket)
+        for inverter_id, bucket in self._open[level].items():
+            if start_ts <= bucket.start < end_ts and (wanted is None or inverter_id == wanted):
+                _merge_into(merged, inverter_id, bucket)
+
+        result = {}
+        for inverter_id, buckets in merged.items():
+            name = names.get(inverter_id, str(inverter_id))
+            result[name] = _summarize(sorted(buckets.values(), key=lambda bucket: bucket.start))
+        return result
+
+    async def async_export(self, level, start, end, destination, export_format, inverter=None):
+        """Write the buckets of level with start <= bucket < end to destination.
+
+        The file is written in the executor from a generator, a chunk of records
+        at a time, so the export takes little memory whatever the range.
+        Returns the number of rows written.
+        """
+        start_ts = bucket_start(level, dt_util.as_timestamp(start))
+        end_ts = int(dt_util.as_timestamp(end))
+        names = {index: name for name, index in self._inverter_ids.items()}
+        wanted = None if inverter is None else self._inverter_ids.get(inverter, -1)
+        open_records = [
+            RECORD.unpack(bucket.pack(inverter_id))
+            for inverter_id, bucket in sorted(self._open[level].items())
+            if start_ts <= bucket.start < end_ts
+        ]
+        return await self._hass.async_add_executor_job(
+            _export, self.path(level), destination, export_format, start_ts, end_ts, names, wanted, open_records
+        )
+
+    def _inverter_id(self, name):
+        inverter_id = self._inverter_ids.get(name)
+        if inverter_id is None:
+            inverter_id = self._inverter_ids[name] = len(self._inverter_ids)
+            self._store.async_delay_save(lambda: {"inverters": list(self._inverter_ids)}, 10)
+        return inverter_id
+
+    def _track(self, coro):
+        task = self._hass.async_create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _async_write(self, closed):
+        async with self._write_lock:
+            for level, records in closed.items():
+                await self._hass.async_add_executor_job(_append, self.path(level), b"".join(records))
+
+
+def _merge_into(merged, inverter_id, bucket):
+    buckets = merged.setdefault(inverter_id, {})
+    existing = buckets.get(bucket.start)
+    if existing is None:
+        buckets[bucket.start] = bucket
+    else:
+        existing.merge(bucket)
+
+
+def _bucket_row(bucket, counter):
+    """Return the row of bucket, energy is what counter moved since the previous bucket.
+
+    The counter keeps its high-water mark, so a bucket ending in a 0 glitch
+    does not make the next one count the whole lifetime counter.
+    """
+    energy = None
+    for total in (bucket.first_total, bucket.last_total):
+        if not math.isnan(total):
+            energy = (energy or 0.0) + (counter.update(total) or 0.0)
+    return {
+        "start": dt_util.as_local(dt_util.utc_from_timestamp(bucket.start)).isoformat(),
+        "average_power": round(bucket.sum_current / bucket.count, 1) if bucket.count else None,
+        "max_power": round(bucket.max_current, 1),
+        "energy": None if energy is None else round(energy / WH_PER_KWH, 3),
+        "samples": bucket.count,
+    }
+
+
+def _summarize(buckets):
+    """Turn buckets into plain dicts, energy is the counter delta per bucket."""
+    counter = EnergyCounter()
+    return [_bucket_row(bucket, counter) for bucket in buckets]
@@ -0,0 +1,131 @@
+"""Timing of the Solar Daytopper poll path."""
+import logging
+import math
+import time
+from collections import deque
+
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+
+from .const import POLL_HISTORY_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Phases of a single poll, in the order they happen
+PHASES = ("resolve", "connect", "response", "decode", "fan_out", "total")
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of values, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+class PollTimings(dict):
+    """Durations in ms of the phases of one poll, filled in as the poll runs."""
+
+    def __init__(self):
+        super().__init__(time=dt_util.utcnow().isoformat(), success=None, size=None, unchanged=False)
+        self._started = time.perf_counter()
+
+    def finish(self, success, error=None):
+        self["total"] = (time.perf_counter() - self._started) * 1000
+        self["success"] = success
+        if error is not None:
+            self["error"] = error
+
+
+class PollMetrics:
+    """Rolling timings and counters of the poll path of one device."""
+
+    def __init__(self, size=POLL_HISTORY_SIZE):
+        self.polls = deque(maxlen=size)
+        self.successes = 0
+        self.failures = 0
+        self.pushes = 0
+        self.unchanged = 0
+        self.last_size = None
+        # Only measured in replay mode
+        self.throughput = None
+        self.loop_lag = None
+        self._listeners = []
+
+    def start_poll(self):
+        return PollTimings()
+
+    def record(self, timings, success, error=None):
+        timings.finish(success, error)
+        self.polls.append(timings)
+        if timings["size"] is not None:
+            self.last_size = timings["size"]
+        if timings["unchanged"]:
+            self.unchanged += 1
+        if success:
+            self.successes += 1
+        else:
+            self.failures += 1
+
+    def record_push(self, size):
+        self.pushes += 1
+        if size is not None:
+            self.last_size = size
+
+    def record_fan_out(self, timings, seconds):
+        """Add the entity fan-out time to the poll that fetched the payload, if any."""
+        if timings is not None:
+            timings["fan_out"] = seconds * 1000
+
+    def phase_percentile(self, phase, fraction):
+        values = [poll[phase] for poll in self.polls if poll.get(phase) is not None and poll["success"]]
+        value = percentile(values, fraction)
+        return None if value is None else round(value, 1)
+
+    @property
+    def values(self):
+        """Values exposed as diagnostic sensors."""
+        return {
+            "total_p50": self.phase_percentile("total", 0.5),
+            "total_p95": self.phase_percentile("total", 0.95),
+            "successes": self.successes,
+            "failures": self.failures,
+            "pushes": self.pushes,
+            "size": self.last_size,
+            "throughput": self.throughput,
+            "loop_lag": self.loop_lag,
+        }
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call update_callback after every poll, return a function to remove it."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    @callback
+    def async_notify(self):
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def as_dict(self):
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "pushes": self.pushes,
+            "unchanged": self.unchanged,
+            "throughput": self.throughput,
+            "loop_lag": self.loop_lag,
+            "percentiles": {
+                phase: {
+                    "p50": self.phase_percentile(phase, 0.5),
+                    "p95": self.phase_percentile(phase, 0.95),
+                    "max": self.phase_percentile(phase, 1.0),
+                }
+                for phase in PHASES
+            },
+            "polls": [
+                {key: round(value, 1) if isinstance(value, float) else value for key, value in poll.items()}
+                for poll in self.polls
+            ],
+        }
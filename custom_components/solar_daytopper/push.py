@@ -0,0 +1,48 @@
+"""Push mode: receive Daytopper readings on a webhook instead of polling."""
+import logging
+
+from aiohttp import web
+
+from homeassistant.components import webhook
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util.json import json_loads
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_setup_push(hass: HomeAssistant, entry, coordinator, webhook_id):
+    """Register the webhook of entry, return a function that removes it."""
+
+    async def handle_webhook(hass, webhook_id, request):
+        body = await request.read()
+        try:
+            data = json_loads(body)
+        except ValueError:
+            _LOGGER.debug("Ignoring push with invalid JSON on webhook %s", webhook_id)
+            return web.Response(status=400)
+        if not isinstance(data, dict):
+            _LOGGER.debug("Ignoring push with unexpected payload on webhook %s", webhook_id)
+            return web.Response(status=400)
+
+        if not coordinator.async_push(data, len(body)):
+            _LOGGER.debug("Ignoring push without known fields on webhook %s", webhook_id)
+            return web.Response(status=400)
+        return web.Response(status=200)
+
+    webhook.async_register(
+        hass,
+        entry.domain,
+        entry.title,
+        webhook_id,
+        handle_webhook,
+        local_only=True,
+        allowed_methods=["POST", "PUT"],
+    )
+    _LOGGER.info(
+        "Push mode enabled for %s, readings are accepted at %s",
+        entry.title,
+        webhook.async_generate_path(webhook_id),
+    )
+
+    return lambda: webhook.async_unregister(hass, webhook_id)
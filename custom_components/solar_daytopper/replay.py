@@ -0,0 +1,222 @@
+"""Replay mode: feed recorded or synthetic payloads to the coordinator.
+
+Used to size a Home Assistant host without hardware. Payloads run through
+the real coordinator and sensors at an accelerated clock, while the event
+loop lag and the update throughput are measured.
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+
+from homeassistant.core import callback
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+
+from .const import (
+    SCAN_INTERVAL,
+    REPLAY_FILE,
+    MAX_REPLAY_SPEED,
+    REPLAY_PEAK_POWER,
+    REPLAY_LAG_SAMPLE_INTERVAL,
+    REPLAY_REPORT_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def replay_chip_id(entry_id):
+    """Return the chipId replayed payloads use, so they never touch the real device's entities."""
+    return f"replay_{entry_id}"
+
+
+def solar_curve(timestamp):
+    """Return the part of the peak power produced at timestamp, 0 at night."""
+    local = dt_util.as_local(dt_util.utc_from_timestamp(timestamp))
+    hour = local.hour + local.minute / 60
+    return max(0.0, math.sin(math.pi * (hour - 6) / 12))
+
+
+class SyntheticSource:
+    """Generate payloads of inverters that follow a solar curve."""
+
+    def __init__(self, inverters, chip_id):
+        self._chip_id = chip_id
+        # Different sizes, so share and imbalance have something to show
+        self._inverters = [(f"inverter{index}", 0.6 + 0.4 * (index % 3) / 2) for index in range(inverters)]
+        self._totals = [0.0] * inverters
+        self._up_since = dt_util.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    async def async_next(self, timestamp):
+        curve = solar_curve(timestamp)
+        readings = {}
+        for index, (name, scale) in enumerate(self._inverters):
+            current = round(REPLAY_PEAK_POWER * scale * curve)
+            self._totals[index] += current * SCAN_INTERVAL.total_seconds() / 3600
+            readings[name] = {"current": current, "total": round(self._totals[index])}
+        return {
+            "system": {
+                "chipId": self._chip_id,
+                "firmwareVersion": "replay",
+                "wifiHostname": "replay",
+                "upSince": self._up_since,
+                "lastApiCall": int(timestamp),
+            },
+            "solarReadingTotal": {
+                "current": sum(reading["current"] for reading in readings.values()),
+                "total": sum(reading["total"] for reading in readings.values()),
+            },
+            "solarReadings": readings,
+        }
+
+    async def async_close(self):
+        pass
+
+
+class FileSource:
+    """Read recorded payloads from a file with one JSON payload per line, in a loop."""
+
+    def __init__(self, hass, path, chip_id):
+        self._hass = hass
+        self._path = path
+        self._chip_id = chip_id
+        self._handle = None
+
+    def _read_line(self):
+        if self._handle is None:
+            self._handle = open(self._path, "rb")
+        for _ in range(2):
+            for line in self._handle:
+                if line.strip():
+                    return line
+            # Start over at the end of the recording
+            self._handle.seek(0)
+        raise ValueError(f"No payloads in {self._path}")
+
+    async def async_next(self, timestamp):
+        line = await self._hass.async_add_executor_job(self._read_line)
+        data = json_loads(line)
+        if isinstance(data, dict) and isinstance(data.get("system"), dict):
+            # Recorded timestamps and identity are replaced by the replay's own
+            data["system"]["lastApiCall"] = int(timestamp)
+            data["system"]["chipId"] = self._chip_id
+        return data
+
+    async def async_close(self):
+        if self._handle is not None:
+            await self._hass.async_add_executor_job(self._handle.close)
+
+
+class ReplayFetcher:
+    """Stand-in for DaytopperFetcher that returns the next replayed payload.
+
+    Every fetch advances the replay clock by one device interval.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._clock = time.time()
+
+    async def async_fetch(self, host, timings=None):
+        if timings is None:
+            timings = {}
+        self._clock += SCAN_INTERVAL.total_seconds()
+        started = time.perf_counter()
+        data = await self._source.async_next(self._clock)
+        timings["decode"] = (time.perf_counter() - started) * 1000
+        return data
+
+    @callback
+    def forget(self, host):
+        pass
+
+    async def async_close(self):
+        await self._source.async_close()
+
+
+class ReplayScheduler:
+    """Poll at a fixed, accelerated interval."""
+
+    def __init__(self, speed):
+        self.interval = timedelta(seconds=SCAN_INTERVAL.total_seconds() / min(speed, MAX_REPLAY_SPEED))
+        self.zero_streak = 0
+        self.failures = 0
+
+    def next_after_success(self, data):
+        self.failures = 0
+        return self.interval
+
+    def next_after_failure(self):
+        self.failures += 1
+        return self.interval
+
+
+def create_replay_fetcher(hass, mode, path, inverters, chip_id):
+    if mode == REPLAY_FILE:
+        return ReplayFetcher(FileSource(hass, path, chip_id))
+    return ReplayFetcher(SyntheticSource(inverters, chip_id))
+
+
+class ReplayMonitor:
+    """Measure the update throughput and event loop lag during a replay."""
+
+    def __init__(self, hass, coordinator):
+        self._hass = hass
+        self._coordinator = coordinator
+        self._updates = 0
+        self._max_lag = 0.0
+        self._window_started = None
+        self._expected = None
+        self._timer = None
+
+    @callback
+    def async_start(self):
+        """Start measuring, return a function that stops it."""
+        remove_listener = self._coordinator.async_add_listener(self._handle_update)
+        self._window_started = time.monotonic()
+        self._schedule_sample()
+
+        def stop():
+            remove_listener()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        return stop
+
+    @callback
+    def _handle_update(self):
+        self._updates += 1
+
+    @callback
+    def _schedule_sample(self):
+        loop = self._hass.loop
+        self._expected = loop.time() + REPLAY_LAG_SAMPLE_INTERVAL
+        self._timer = loop.call_at(self._expected, self._sample)
+
+    @callback
+    def _sample(self):
+        # A late timer means something else held the event loop
+        self._max_lag = max(self._max_lag, self._hass.loop.time() - self._expected)
+        now = time.monotonic()
+        elapsed = now - self._window_started
+        if elapsed >= REPLAY_REPORT_INTERVAL.total_seconds():
+            self._report(elapsed)
+            self._window_started = now
+            self._updates = 0
+            self._max_lag = 0.0
+        self._schedule_sample()
+
+    @callback
+    def _report(self, elapsed):
+        metrics = self._coordinator.metrics
+        metrics.throughput = round(self._updates / elapsed, 2)
+        metrics.loop_lag = round(self._max_lag * 1000, 1)
+        inverters = len(self._coordinator.snapshot.inverters)
+        _LOGGER.info(
+            "Replay of %d inverter(s): %s updates/s, max event loop lag %s ms",
+            inverters,
+            metrics.throughput,
+            metrics.loop_lag,
+        )
+        metrics.async_notify()
@@ -0,0 +1,107 @@
+"""Adaptive poll scheduling for Solar Daytopper."""
+import logging
+import random
+from datetime import timedelta
+
+from homeassistant.const import SUN_EVENT_SUNRISE
+from homeassistant.helpers.sun import get_astral_event_next, is_up
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    SCAN_INTERVAL,
+    POLL_ALIGN_MARGIN,
+    MIN_SCAN_INTERVAL,
+    NIGHT_SCAN_INTERVAL,
+    IDLE_SCAN_INTERVAL,
+    ZERO_PRODUCTION_THRESHOLD,
+    MAX_BACKOFF_INTERVAL,
+    BACKOFF_JITTER,
+)
+from .utils import as_number
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def current_production(data):
+    """Return the total current power in a payload, or None if unknown."""
+    if not isinstance(data, dict):
+        return None
+    total = data.get("solarReadingTotal")
+    if isinstance(total, dict) and as_number(total.get("current")) is not None:
+        return total["current"]
+
+    readings = data.get("solarReadings")
+    if not isinstance(readings, dict):
+        return None
+    values = [
+        reading["current"]
+        for reading in readings.values()
+        if isinstance(reading, dict) and as_number(reading.get("current")) is not None
+    ]
+    return sum(values) if values else None
+
+
+class PollScheduler:
+    """Decide when the coordinator should poll the device next."""
+
+    def __init__(self, hass):
+        self._hass = hass
+        self.zero_streak = 0
+        self.failures = 0
+        self._last_data = None
+
+    def next_after_success(self, data):
+        """Return the delay until the next poll after a successful fetch."""
+        self.failures = 0
+        now = dt_util.utcnow()
+
+        production = current_production(data)
+        if production == 0:
+            # An unchanged payload is not another reading without production
+            if data is not self._last_data:
+                self.zero_streak += 1
+        else:
+            self.zero_streak = 0
+        self._last_data = data
+
+        if production == 0 and not is_up(self._hass, now):
+            # Sleep through the night, but be back in time for sunrise
+            sunrise = get_astral_event_next(self._hass, SUN_EVENT_SUNRISE, now)
+            delay = min(NIGHT_SCAN_INTERVAL, sunrise - now + POLL_ALIGN_MARGIN)
+            return max(delay, MIN_SCAN_INTERVAL)
+
+        if self.zero_streak >= ZERO_PRODUCTION_THRESHOLD:
+            return IDLE_SCAN_INTERVAL
+
+        return self._aligned_delay(data, now)
+
+    def next_after_failure(self):
+        """Return the delay until the next attempt after a failed fetch."""
+        self.failures += 1
+        delay = min(
+            MAX_BACKOFF_INTERVAL.total_seconds(),
+            SCAN_INTERVAL.total_seconds() * 2 ** (self.failures - 1),
+        )
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        return timedelta(seconds=delay)
+
+    def _aligned_delay(self, data, now):
+        """Poll just after the device is expected to upload its next reading."""
+        system = data.get("system") if isinstance(data, dict) else None
+        last_api_call = as_number(system.get("lastApiCall")) if isinstance(system, dict) else None
+        if last_api_call is None:
+            return SCAN_INTERVAL
+
+        interval = SCAN_INTERVAL.total_seconds()
+        delay = last_api_call + interval + POLL_ALIGN_MARGIN.total_seconds() - now.timestamp()
+        if delay > interval + POLL_ALIGN_MARGIN.total_seconds():
+            # Device clock is ahead of ours, alignment is meaningless
+            _LOGGER.debug("lastApiCall %s is in the future, not aligning", last_api_call)
+            return SCAN_INTERVAL
+        if delay < -interval:
+            # The device has not uploaded for a while, keep the regular rhythm
+            return SCAN_INTERVAL
+
+        while delay < MIN_SCAN_INTERVAL.total_seconds():
+            delay += interval
+        return timedelta(seconds=delay)
@@ -0,0 +1,162 @@
+"""Validation of the Daytopper payload, compiled once per device."""
+import logging
+import time
+
+from .const import (
+    PAYLOAD_SYSTEM_FIELDS,
+    PAYLOAD_READING_FIELDS,
+    SCHEMA_WARNING_INTERVAL,
+    TIMESTAMP_FORMATS,
+)
+from .extractors import TIMESTAMP_PARSERS, _parse_any
+from .utils import as_number
+
+_LOGGER = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _is_number(value):
+    return as_number(value) is not None
+
+
+def _is_counter(value):
+    return _is_number(value) and value >= 0
+
+
+def _is_identifier(value):
+    return isinstance(value, str) or (_is_number(value) and float(value).is_integer())
+
+
+def _is_text(value):
+    return isinstance(value, str)
+
+
+def _compile_timestamp_check(path):
+    parser = TIMESTAMP_PARSERS.get(TIMESTAMP_FORMATS.get(path), _parse_any)
+
+    def check(value):
+        try:
+            parser(value)
+        except (ValueError, TypeError, AttributeError, OSError, OverflowError):
+            return False
+        return True
+
+    return check
+
+
+CHECKS = {
+    "number": _is_number,
+    "counter": _is_counter,
+    "identifier": _is_identifier,
+    "text": _is_text,
+}
+
+
+def _compile_fields(prefix, fields):
+    """Return (key, check) pairs for the fields of one part of the payload."""
+    compiled = []
+    for key, kind in fields.items():
+        if kind == "timestamp":
+            check = _compile_timestamp_check((*prefix, key))
+        else:
+            check = CHECKS[kind]
+        compiled.append((key, check))
+    return tuple(compiled)
+
+
+class PayloadSchema:
+    """Check every known field of a payload and repair the invalid ones in place.
+
+    An invalid field is replaced by its last good value, or dropped if there is
+    none, so one bad field from the firmware does not fail the whole poll.
+    Every invalid field is reported at most once per SCHEMA_WARNING_INTERVAL.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._system_fields = _compile_fields(("system",), PAYLOAD_SYSTEM_FIELDS)
+        self._reading_fields = _compile_fields(("solarReadings",), PAYLOAD_READING_FIELDS)
+        self._last_good = {}
+        self._warned = {}
+
+    def validate(self, data):
+        """Repair data in place, return False if nothing in it is usable."""
+        usable = False
+
+        system = self._section(data, "system")
+        if system is not None:
+            self._check_fields(("system",), system, self._system_fields)
+            usable = True
+
+        total = self._section(data, "solarReadingTotal")
+        if total is not None:
+            self._check_fields(("solarReadingTotal",), total, self._reading_fields)
+            usable = True
+
+        readings = self._section(data, "solarReadings")
+        if readings is not None:
+            for name in list(readings):
+                path = ("solarReadings", name)
+                reading = readings[name]
+                if not isinstance(reading, dict):
+                    self._warn(path, reading)
+                    last = self._last_good.get(path)
+                    if last is None:
+                        del readings[name]
+                        continue
+                    reading = readings[name] = dict(last)
+                self._check_fields(path, reading, self._reading_fields)
+                self._last_good[path] = reading
+            usable = True
+
+        return usable
+
+    def _section(self, data, key):
+        """Return the dict at key, restored from the last good one if invalid."""
+        section = data.get(key, _MISSING)
+        if section is _MISSING:
+            return None
+        if not isinstance(section, dict):
+            self._warn((key,), section)
+            last = self._last_good.get((key,))
+            if last is None:
+                del data[key]
+                return None
+            section = data[key] = dict(last)
+        self._last_good[(key,)] = section
+        return section
+
+    def _check_fields(self, prefix, container, fields):
+        for key, check in fields:
+            value = container.get(key, _MISSING)
+            path = (*prefix, key)
+            if value is _MISSING or value is None:
+                continue
+            if check(value):
+                self._last_good[path] = value
+                continue
+
+            self._warn(path, value)
+            last = self._last_good.get(path, _MISSING)
+            if last is _MISSING:
+                del container[key]
+            else:
+                container[key] = last
+
+    def _warn(self, path, value):
+        """Log an invalid field, at most once per interval per field."""
+        now = time.monotonic()
+        warned = self._warned.get(path)
+        if warned is not None and now - warned[0] < SCHEMA_WARNING_INTERVAL.total_seconds():
+            self._warned[path] = (warned[0], warned[1] + 1)
+            return
+        suppressed = warned[1] if warned is not None else 0
+        self._warned[path] = (now, 0)
+        _LOGGER.warning(
+            "%s sent an invalid value for %s: %r, keeping the last good value%s",
+            self._name,
+            ".".join(path),
+            value,
+            f" ({suppressed} more since the last warning)" if suppressed else "",
+        )
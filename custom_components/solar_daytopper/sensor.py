@@ -1,12 +1,32 @@
 import logging
-from datetime import datetime
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import RestoreSensor, SensorEntity
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.helpers.entity import DeviceInfo, EntityCategory
-from homeassistant.util import dt as dt_util
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
 
-from .const import DOMAIN, MAIN_SENSORS, DIAGNOSTIC_SENSORS, INVERTER_SENSOR_TEMPLATE
+from .const import (
+    DOMAIN,
+    MAIN_SENSORS,
+    DIAGNOSTIC_SENSORS,
+    INVERTER_SENSOR_TEMPLATE,
+    INVERTER_ENERGY_SENSOR,
+    INVERTER_DERIVED_SENSOR_TEMPLATE,
+    MAIN_DERIVED_SENSORS,
+    POLL_DIAGNOSTIC_SENSORS,
+    REPLAY_DIAGNOSTIC_SENSORS,
+    CONF_REPLAY_MODE,
+    DEFAULT_REPLAY_MODE,
+    REPLAY_OFF,
+    CONF_DEADBAND_WATTS,
+    CONF_DEADBAND_PERCENT,
+    DEFAULT_DEADBAND_WATTS,
+    DEFAULT_DEADBAND_PERCENT,
+)
+from .analytics import IMBALANCE_STATES
+from .extractors import compile_extractor
+from .utils import make_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,13 +34,20 @@ async def async_setup_entry(hass, entry, async_add_entities):
     _LOGGER.debug("Setting up Solar Daytopper sensors")
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
     host_url = hass.data[DOMAIN][entry.entry_id]["host"]
+    chip_id = coordinator.snapshot.chip_id
+
+    # Power sensors ignore fluctuations inside this band
+    deadband = (
+        entry.options.get(CONF_DEADBAND_WATTS, DEFAULT_DEADBAND_WATTS),
+        entry.options.get(CONF_DEADBAND_PERCENT, DEFAULT_DEADBAND_PERCENT),
+    )
 
     entities = []
     
     # 1. Add main total sensors first
     _LOGGER.debug("Adding main total sensors")
     for name, path, unit, device_class, state_class, multiplier, entity_category in MAIN_SENSORS:
-        unique_id = f"{DOMAIN}_{name.lower().replace(' ', '_')}"
+        unique_id = make_unique_id(chip_id, name)
         entities.append(
             SolarDaytopperSensor(
                 coordinator,
@@ -33,46 +60,44 @@ async def async_setup_entry(hass, entry, async_add_entities):
                 multiplier,
                 host_url,
                 entity_category,
+                deadband,
+            )
+        )
+
+    # Statistics of the whole device
+    for name, statistic, unit, device_class, state_class, entity_category in MAIN_DERIVED_SENSORS:
+        entities.append(
+            SolarDaytopperDerivedSensor(
+                coordinator,
+                name,
+                statistic,
+                unit,
+                device_class,
+                state_class,
+                make_unique_id(chip_id, name),
+                host_url,
+                entity_category,
             )
         )
 
     # 2. Add dynamic inverter sensors
     _LOGGER.debug("Checking for dynamic inverter sensors")
-    if coordinator.data and "solarReadings" in coordinator.data:
-        solar_readings = coordinator.data["solarReadings"]
-        _LOGGER.debug("Found solarReadings data: %s", list(solar_readings.keys()))
-        
-        for inverter_name in solar_readings.keys():
-            # Create sensors for each inverter
-            for sensor_type, field, unit, device_class, state_class, multiplier, entity_category in INVERTER_SENSOR_TEMPLATE:
-                name = f"Solar Daytopper {inverter_name.title()} {sensor_type}"
-                path = ["solarReadings", inverter_name, field]
-                unique_id = f"{DOMAIN}_{name.lower().replace(' ', '_')}"
-                
-                entities.append(
-                    SolarDaytopperSensor(
-                        coordinator,
-                        name,
-                        path,
-                        unit,
-                        device_class,
-                        state_class,
-                        unique_id,
-                        multiplier,
-                        host_url,
-                        entity_category,
-                    )
-                )
-                
+    inverters = list(coordinator.known_inverters)
+    if inverters:
+        _LOGGER.debug("Found solarReadings data: %s", list(inverters))
+
+        for inverter_name in inverters:
+            entities.extend(_build_inverter_entities(coordinator, inverter_name, chip_id, host_url, deadband))
+
         _LOGGER.info("Created sensors for %d inverter(s): %s", 
-                    len(solar_readings), list(solar_readings.keys()))
+                    len(inverters), list(inverters))
     else:
         _LOGGER.debug("No solarReadings data found or coordinator data is empty")
 
     # 3. Add diagnostic sensors last
     _LOGGER.debug("Adding diagnostic sensors")
     for name, path, unit, device_class, state_class, multiplier, entity_category in DIAGNOSTIC_SENSORS:
-        unique_id = f"{DOMAIN}_{name.lower().replace(' ', '_')}"
+        unique_id = make_unique_id(chip_id, name)
         entities.append(
             SolarDaytopperSensor(
                 coordinator,
@@ -88,13 +113,131 @@ async def async_setup_entry(hass, entry, async_add_entities):
             )
         )
 
+    # 4. Add poll path diagnostics, and the capacity measurements of a replay
+    poll_sensors = list(POLL_DIAGNOSTIC_SENSORS)
+    if entry.options.get(CONF_REPLAY_MODE, DEFAULT_REPLAY_MODE) != REPLAY_OFF:
+        poll_sensors += REPLAY_DIAGNOSTIC_SENSORS
+    for name, metric, unit, device_class, state_class, multiplier, entity_category in poll_sensors:
+        entities.append(
+            SolarDaytopperPollSensor(
+                coordinator,
+                name,
+                metric,
+                unit,
+                device_class,
+                state_class,
+                make_unique_id(chip_id, name),
+                host_url,
+                entity_category,
+            )
+        )
+
     _LOGGER.debug("Adding %d entities to Home Assistant", len(entities))
-    async_add_entities(entities, True)
+    async_add_entities(entities)
+
+    # Inverters that show up later get their sensors without reloading the entry
+    known_inverters = set(inverters)
+
+    @callback
+    def _async_discover_inverters():
+        new_inverters = [name for name in coordinator.snapshot.inverters if name not in known_inverters]
+        if not new_inverters:
+            return
+        known_inverters.update(new_inverters)
+        _LOGGER.info("Discovered new inverter(s): %s", new_inverters)
+        async_add_entities([
+            entity
+            for inverter_name in new_inverters
+            for entity in _build_inverter_entities(coordinator, inverter_name, chip_id, host_url, deadband)
+        ])
+
+    entry.async_on_unload(coordinator.async_add_listener(_async_discover_inverters))
     _LOGGER.debug("Solar Daytopper sensor setup completed")
 
-class SolarDaytopperSensor(CoordinatorEntity, SensorEntity):
-    def __init__(self, coordinator, name, path, unit, device_class, state_class, unique_id, multiplier, host_url=None, entity_category=None):
+def _build_inverter_entities(coordinator, inverter_name, chip_id, host_url, deadband):
+    """Create the sensors of a single inverter."""
+    entities = []
+    for sensor_type, field, unit, device_class, state_class, multiplier, entity_category in INVERTER_SENSOR_TEMPLATE:
+        name = f"Solar Daytopper {inverter_name.title()} {sensor_type}"
+        path = ["solarReadings", inverter_name, field]
+        unique_id = make_unique_id(chip_id, name)
+
+        entities.append(
+            SolarDaytopperSensor(
+                coordinator,
+                name,
+                path,
+                unit,
+                device_class,
+                state_class,
+                unique_id,
+                multiplier,
+                host_url,
+                entity_category,
+                deadband,
+                inverter=inverter_name,
+            )
+        )
+
+    # Statistics derived from the readings of the inverter
+    for sensor_type, statistic, unit, device_class, state_class, entity_category in INVERTER_DERIVED_SENSOR_TEMPLATE:
+        name = f"Solar Daytopper {inverter_name.title()} {sensor_type}"
+        entities.append(
+            SolarDaytopperDerivedSensor(
+                coordinator,
+                name,
+                statistic,
+                unit,
+                device_class,
+                state_class,
+                make_unique_id(chip_id, name),
+                host_url,
+                entity_category,
+                inverter=inverter_name,
+            )
+        )
+
+    # Gap-filled energy, integrated from power and the device counter
+    sensor_type, unit, device_class, state_class = INVERTER_ENERGY_SENSOR
+    name = f"Solar Daytopper {inverter_name.title()} {sensor_type}"
+    entities.append(
+        SolarDaytopperEnergySensor(
+            coordinator,
+            name,
+            inverter_name,
+            unit,
+            device_class,
+            state_class,
+            make_unique_id(chip_id, name),
+            host_url,
+        )
+    )
+    return entities
+
+def build_device_info(coordinator, host_url):
+    """Return the device info shared by all entities of one Daytopper."""
+    snapshot = coordinator.snapshot
+    chip_id = snapshot.chip_id or "solar_daytopper_default"
+    _LOGGER.debug("Creating device with chipId: %s", chip_id)
+
+    # Ensure proper URL format for configuration_url
+    config_url = host_url
+    if host_url and not host_url.startswith(('http://', 'https://')):
+        config_url = f"http://{host_url}"
+
+    return DeviceInfo(
+        identifiers={(DOMAIN, chip_id)},
+        name="Solar Daytopper",
+        manufacturer="Solar Daytopper",
+        model="Solar Monitor",
+        sw_version=str(snapshot.firmware_version if snapshot.firmware_version is not None else "Unknown"),
+        configuration_url=config_url,
+    )
+
+class SolarDaytopperSensor(CoordinatorEntity, RestoreSensor):
+    def __init__(self, coordinator, name, path, unit, device_class, state_class, unique_id, multiplier, host_url=None, entity_category=None, deadband=None, inverter=None):
         super().__init__(coordinator)
+        self._inverter = inverter
         self._attr_name = name
         self._path = path
         self._attr_native_unit_of_measurement = unit
@@ -103,105 +246,233 @@ class SolarDaytopperSensor(CoordinatorEntity, SensorEntity):
         self._attr_unique_id = unique_id
         self._attr_entity_category = entity_category
         self._multiplier = multiplier
-        self._last_value = None 
-        
-        # Add device info
-        system_data = coordinator.data.get("system", {}) if coordinator.data else {}
-        chip_id = system_data.get("chipId", "solar_daytopper_default")
-        _LOGGER.debug("Creating device with chipId: %s", chip_id)
-        
-        # Ensure proper URL format for configuration_url
-        config_url = host_url
-        if host_url and not host_url.startswith(('http://', 'https://')):
-            config_url = f"http://{host_url}"
-        
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, chip_id)},
-            name="Solar Daytopper",
-            manufacturer="Solar Daytopper",
-            model="Solar Monitor",
-            sw_version=str(system_data.get("firmwareVersion", "Unknown")),
-            configuration_url=config_url,
-        ) 
+        self._last_value = None
+        self._deadband = deadband if device_class == "power" else None
+        self._key = tuple(path)
+        coordinator.async_register_value(
+            self._key, compile_extractor(name, path, unit, device_class, state_class, multiplier)
+        )
+
+        self._attr_device_info = build_device_info(coordinator, host_url)
+
+        self._attr_native_value = self._compute_value()
+        self._written_available = None
+
+    @property
+    def available(self):
+        """Sensors of an inverter that vanished from the payload are unavailable."""
+        return super().available and (
+            self._inverter is None or self._inverter in self.coordinator.snapshot.inverter_set
+        )
+
+    def _compute_value(self):
+        """Take the decoded value from the coordinator snapshot."""
+        value = self.coordinator.snapshot.values.get(self._key)
+
+        if isinstance(value, (int, float)):
+            # For total_increasing sensors: ensure the value never decreases
+            if self._attr_state_class == "total_increasing":
+                # If the new value is 0 and we had a previous value, keep the old value
+                if value == 0 and self._last_value not in (None, 0):
+                    _LOGGER.debug("Total sensor %s: value is 0, keeping last value %s", self._attr_name, self._last_value)
+                    return self._last_value
+
+                # If the new value is lower than the previous value, keep the old value
+                if self._last_value is not None and value < self._last_value:
+                    _LOGGER.debug("Total sensor %s: new value %s is lower than previous %s, keeping previous",
+                                self._attr_name, value, self._last_value)
+                    return self._last_value
+
+            # Update the last_value for all numeric sensors
+            self._last_value = value
+
+        return value
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state only when the value or availability changed."""
+        value = self._compute_value()
+        available = self.available
+        if available == self._written_available and (
+            value == self._attr_native_value or self._within_deadband(value)
+        ):
+            return
+
+        self._attr_native_value = value
+        self._written_available = available
+        self.async_write_ha_state()
+
+    def _within_deadband(self, value):
+        """Return True if value is too close to the reported value to be written."""
+        if self._deadband is None:
+            return False
+        previous = self._attr_native_value
+        if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+            return False
+        # Always report production starting or stopping
+        if value == 0 or previous == 0:
+            return False
+
+        absolute, percent = self._deadband
+        delta = abs(value - previous)
+        if absolute and delta < absolute:
+            return True
+        if percent and delta < abs(previous) * percent / 100:
+            return True
+        return False
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        # Keep the never-decreasing guard of totals across restarts
+        if self._attr_state_class == "total_increasing":
+            last = await self.async_get_last_sensor_data()
+            if last is not None and isinstance(last.native_value, (int, float)):
+                if self._last_value is None or last.native_value > self._last_value:
+                    self._last_value = last.native_value
+                    self._attr_native_value = self._compute_value()
+        self._written_available = self.available
+
+
+class EnergyExtraStoredData(ExtraStoredData):
+    """Accumulator or statistics state stored across restarts."""
+
+    def __init__(self, state):
+        self.state = state
+
+    def as_dict(self):
+        return self.state
+
+
+class SolarDaytopperEnergySensor(CoordinatorEntity, SensorEntity, RestoreEntity):
+    def __init__(self, coordinator, name, inverter, unit, device_class, state_class, unique_id, host_url=None):
+        super().__init__(coordinator)
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._attr_unique_id = unique_id
+        self._attr_device_info = build_device_info(coordinator, host_url)
+        self._inverter = inverter
+        self._accumulator = coordinator.async_get_energy_accumulator(inverter)
+        self._attr_native_value = self._compute_value()
+        self._written_available = None
+
+    @property
+    def available(self):
+        return super().available and self._inverter in self.coordinator.snapshot.inverter_set
+
+    def _compute_value(self):
+        return round(self._accumulator.energy, 3)
 
     @property
-    def native_value(self):
-        data = self.coordinator.data
-        try:
-            # Special handling for timestamp sensors
-            if self._attr_device_class == "timestamp":
-                if self._path == ["_last_update"]:
-                    timestamp_str = data.get("_last_update")
-                elif self._path == ["system", "upSince"]:
-                    # Navigate to the upSince field
-                    timestamp_str = data.get("system", {}).get("upSince")
-                elif self._path == ["system", "lastApiCall"]:
-                    # Navigate to the lastApiCall field (Unix timestamp)
-                    timestamp_value = data.get("system", {}).get("lastApiCall")
-                    if timestamp_value:
-                        try:
-                            # Convert Unix timestamp to datetime
-                            dt = datetime.fromtimestamp(timestamp_value)
-                            # Add local timezone
-                            dt = dt_util.as_local(dt)
-                            return dt
-                        except (ValueError, OSError) as err:
-                            _LOGGER.warning("Error parsing Unix timestamp %s for %s: %s", timestamp_value, self._attr_name, err)
-                            return None
-                    return None
-                else:
-                    timestamp_str = None
-                
-                if timestamp_str:
-                    try:
-                        # Try different timestamp formats
-                        if self._path == ["_last_update"]:
-                            # ISO format: 2025-08-12T16:34:14.453838
-                            dt = datetime.fromisoformat(timestamp_str)
-                        elif self._path == ["system", "upSince"]:
-                            # Simple format: 2025-08-11 07:35:06
-                            dt = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-                        else:
-                            # Try to parse as ISO first, then simple format
-                            try:
-                                dt = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                            except ValueError:
-                                dt = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-                        
-                        # If no timezone info, assume local timezone
-                        if dt.tzinfo is None:
-                            dt = dt_util.as_local(dt)
-                        return dt
-                    except ValueError as err:
-                        _LOGGER.warning("Error parsing timestamp %s for %s: %s", timestamp_str, self._attr_name, err)
-                        return None
-                return None
-            
-            for key in self._path:
-                data = data.get(key, {})
-
-            if isinstance(data, (int, float)):
-                value = data / self._multiplier if self._multiplier else data
-
-                # For total_increasing sensors: ensure the value never decreases
-                if self._attr_state_class == "total_increasing":
-                    # If the new value is 0 and we had a previous value, keep the old value
-                    if value == 0 and self._last_value not in (None, 0):
-                        _LOGGER.debug("Total sensor %s: value is 0, keeping last value %s", self._attr_name, self._last_value)
-                        return self._last_value
-
-                    # If the new value is lower than the previous value, keep the old value
-                    if self._last_value is not None and value < self._last_value:
-                        _LOGGER.debug("Total sensor %s: new value %s is lower than previous %s, keeping previous", 
-                                    self._attr_name, value, self._last_value)
-                        return self._last_value
-
-                # Update the last_value for all numeric sensors
-                self._last_value = value
-                return value
-
-            return data
-
-        except Exception as err:
-            _LOGGER.warning("Error accessing sensor path %s: %s", self._path, err)
+    def extra_restore_state_data(self):
+        return EnergyExtraStoredData(self._accumulator.as_dict())
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        last_extra_data = await self.async_get_last_extra_data()
+        if last_extra_data is not None:
+            self._accumulator.restore(last_extra_data.as_dict())
+            _LOGGER.debug("Restored %s: %s kWh", self._attr_name, self._accumulator.energy)
+        self._attr_native_value = self._compute_value()
+        self._written_available = self.available
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state only when the energy or availability changed."""
+        value = self._compute_value()
+        available = self.available
+        if value == self._attr_native_value and available == self._written_available:
+            return
+
+        self._attr_native_value = value
+        self._written_available = available
+        self.async_write_ha_state()
+
+
+class SolarDaytopperDerivedSensor(CoordinatorEntity, SensorEntity, RestoreEntity):
+    """A statistic derived by the coordinator, of one inverter or the whole device."""
+
+    def __init__(self, coordinator, name, statistic, unit, device_class, state_class, unique_id, host_url=None, entity_category=None, inverter=None):
+        super().__init__(coordinator)
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._attr_unique_id = unique_id
+        self._attr_entity_category = entity_category
+        if device_class == "enum":
+            self._attr_options = IMBALANCE_STATES
+        self._attr_device_info = build_device_info(coordinator, host_url)
+        self._inverter = inverter
+        self._statistic = statistic
+        self._stats = coordinator.async_get_stats(inverter)
+        self._attr_native_value = self._compute_value()
+        self._written_available = None
+
+    @property
+    def available(self):
+        return super().available and (
+            self._inverter is None or self._inverter in self.coordinator.snapshot.inverter_set
+        )
+
+    def _compute_value(self):
+        return getattr(self._stats, self._statistic)
+
+    @property
+    def extra_restore_state_data(self):
+        # Today's yield carries the statistics across restarts
+        if self._statistic != "today":
             return None
+        return EnergyExtraStoredData(self._stats.as_dict())
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if self._statistic == "today":
+            last_extra_data = await self.async_get_last_extra_data()
+            if last_extra_data is not None:
+                self._stats.restore(last_extra_data.as_dict())
+                self._attr_native_value = self._compute_value()
+        self._written_available = self.available
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state only when the statistic or availability changed."""
+        value = self._compute_value()
+        available = self.available
+        if value == self._attr_native_value and available == self._written_available:
+            return
+
+        self._attr_native_value = value
+        self._written_available = available
+        self.async_write_ha_state()
+
+
+class SolarDaytopperPollSensor(SensorEntity):
+    """Timing of the poll path, available even when the device is not."""
+
+    _attr_should_poll = False
+
+    def __init__(self, coordinator, name, metric, unit, device_class, state_class, unique_id, host_url=None, entity_category=None):
+        self._metrics = coordinator.metrics
+        self._metric = metric
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._attr_unique_id = unique_id
+        self._attr_entity_category = entity_category
+        self._attr_device_info = build_device_info(coordinator, host_url)
+        self._attr_native_value = self._metrics.values[metric]
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(self._metrics.async_add_listener(self._handle_metrics_update))
+
+    @callback
+    def _handle_metrics_update(self):
+        value = self._metrics.values[self._metric]
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        self.async_write_ha_state()
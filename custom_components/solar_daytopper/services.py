@@ -0,0 +1,106 @@
+"""Services for the Solar Daytopper integration."""
+import logging
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, HISTORY_LEVELS, EXPORT_FORMATS
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_GET_HISTORY = "get_history"
+SERVICE_EXPORT = "export"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_RESOLUTION = "resolution"
+ATTR_INVERTER = "inverter"
+ATTR_FILENAME = "filename"
+ATTR_FORMAT = "format"
+
+GET_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_START): cv.datetime,
+    vol.Optional(ATTR_END): cv.datetime,
+    vol.Optional(ATTR_RESOLUTION, default="hour"): vol.In([level for level, _, _ in HISTORY_LEVELS]),
+    vol.Optional(ATTR_INVERTER): cv.string,
+})
+
+EXPORT_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_FILENAME): cv.string,
+    vol.Required(ATTR_START): cv.datetime,
+    vol.Optional(ATTR_END): cv.datetime,
+    vol.Optional(ATTR_RESOLUTION, default="5min"): vol.In([level for level, _, _ in HISTORY_LEVELS]),
+    vol.Optional(ATTR_FORMAT, default="csv"): vol.In(EXPORT_FORMATS),
+    vol.Optional(ATTR_INVERTER): cv.string,
+})
+
+
+def _entry_data(hass, call):
+    entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+    entry_data = hass.data.get(DOMAIN, {}).get(entry_id)
+    if entry_data is None:
+        raise ServiceValidationError(f"Solar Daytopper entry {entry_id} is not loaded")
+    return entry_data
+
+
+async def _async_get_history(hass, call):
+    history = _entry_data(hass, call)["history"]
+    start = call.data[ATTR_START]
+    end = call.data.get(ATTR_END) or dt_util.now()
+    resolution = call.data[ATTR_RESOLUTION]
+
+    inverters = await history.async_query(resolution, start, end, call.data.get(ATTR_INVERTER))
+    return {"resolution": resolution, "inverters": inverters}
+
+
+async def _async_export(hass, call):
+    history = _entry_data(hass, call)["history"]
+    # Relative names are placed in the configuration directory
+    filename = hass.config.path(call.data[ATTR_FILENAME])
+    if not hass.config.is_allowed_path(filename):
+        raise ServiceValidationError(
+            f"Cannot write to {filename}, add its directory to allowlist_external_dirs"
+        )
+    start = call.data[ATTR_START]
+    end = call.data.get(ATTR_END) or dt_util.now()
+    resolution = call.data[ATTR_RESOLUTION]
+
+    rows = await history.async_export(
+        resolution, start, end, filename, call.data[ATTR_FORMAT], call.data.get(ATTR_INVERTER)
+    )
+    _LOGGER.debug("Exported %d %s history row(s) to %s", rows, resolution, filename)
+    return {"filename": filename, "rows": rows}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+
+    async def handle_get_history(call: ServiceCall):
+        return await _async_get_history(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        handle_get_history,
+        schema=GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def handle_export(call: ServiceCall):
+        result = await _async_export(hass, call)
+        return result if call.return_response else None
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT,
+        handle_export,
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
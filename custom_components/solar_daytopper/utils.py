@@ -1,19 +1,62 @@
 """Utility functions for Solar Daytopper integration."""
+import asyncio
 import socket
 import logging
+import time
 from urllib.parse import urlparse, urlunparse
 
+from .const import DOMAIN, MDNS_CACHE_TTL
+
 _LOGGER = logging.getLogger(__name__)
 
+# Device totals are reported in Wh
+WH_PER_KWH = 1000
+
+
+def as_number(value):
+    """Return value if it is an int or float reading, else None."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def make_unique_id(chip_id, name):
+    """Build an entity unique ID that is scoped to a single device."""
+    slug = name.lower().replace(" ", "_")
+    if chip_id is None:
+        return f"{DOMAIN}_{slug}"
+    return f"{DOMAIN}_{chip_id}_{slug}"
+
+
+def legacy_unique_id_suffix(unique_id):
+    """Return the name slug of a unique ID from before multi-device support.
+
+    Those IDs were not scoped to the device: solar_daytopper_solar_daytopper_current.
+    """
+    if unique_id.startswith(f"{DOMAIN}_{DOMAIN}_"):
+        return unique_id[len(DOMAIN) + 1:]
+    return None
+
+
+def sample_timestamp(data):
+    """Return when the device took the reading, falling back to now."""
+    system = data.get("system") if isinstance(data, dict) else None
+    last_api_call = as_number(system.get("lastApiCall")) if isinstance(system, dict) else None
+    if last_api_call is not None and last_api_call > 0:
+        return int(last_api_call)
+    return int(time.time())
+
+
 async def resolve_mdns_url(url):
     """Try to resolve .local domain to IP address."""
     try:
         parsed = urlparse(url)
-        
+
         if ".local" in parsed.hostname:
-            # Probeer het hostname te resolven naar een IP
+            # Probeer het hostname te resolven naar een IP, zonder de event loop te blokkeren
             try:
-                ip = socket.gethostbyname(parsed.hostname)
+                loop = asyncio.get_running_loop()
+                ip = await loop.run_in_executor(None, socket.gethostbyname, parsed.hostname)
                 # Vervang hostname met IP in de URL
                 new_netloc = parsed.netloc.replace(parsed.hostname, ip)
                 resolved_url = urlunparse((
@@ -29,8 +72,35 @@ async def resolve_mdns_url(url):
             except socket.gaierror:
                 _LOGGER.debug("Failed to resolve hostname: %s", parsed.hostname)
                 return None
-        
+
         return url
     except Exception as err:
         _LOGGER.debug("Error resolving mDNS URL: %s", err)
         return None
+
+
+class MdnsResolver:
+    """Cache resolved .local URLs so the poll loop does not query mDNS every cycle."""
+
+    def __init__(self, ttl=MDNS_CACHE_TTL):
+        self._ttl = ttl
+        self._cache = {}
+
+    async def async_resolve(self, url):
+        """Return the resolved URL for url, falling back to url itself."""
+        cached = self._cache.get(url)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        resolved_url = await resolve_mdns_url(url)
+        if not resolved_url:
+            # Do not cache failures, the next poll should try again
+            return url
+
+        self._cache[url] = (resolved_url, time.monotonic() + self._ttl)
+        return resolved_url
+
+    def invalidate(self, url):
+        """Forget the cached resolution for url, e.g. after a failed fetch."""
+        if self._cache.pop(url, None) is not None:
+            _LOGGER.debug("Invalidated cached resolution for %s", url)
@@ -0,0 +1,91 @@
+"""Find a Solar Daytopper at an address, shared by the config and options flow."""
+import asyncio
+import logging
+from urllib.parse import urlparse, urlunparse
+
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import PROBE_TIMEOUT
+from .utils import resolve_mdns_url
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def is_valid_url(url):
+    """Validate if the URL is valid."""
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except Exception:
+        return False
+
+
+def is_daytopper_payload(payload):
+    """Return True if payload has the shape of a Daytopper API response."""
+    if not isinstance(payload, dict) or not isinstance(payload.get("system"), dict):
+        return False
+    return isinstance(payload.get("solarReadings"), dict) or isinstance(payload.get("solarReadingTotal"), dict)
+
+
+def candidate_urls(host):
+    """Return host and the addresses worth trying when host itself does not answer."""
+    parsed = urlparse(host)
+    candidates = [host]
+    if parsed.scheme == "https":
+        candidates.append(urlunparse(parsed._replace(scheme="http")))
+    if parsed.hostname and parsed.hostname.endswith(".local"):
+        # Routers often serve the bare hostname through their own DNS
+        bare = parsed.hostname[: -len(".local")]
+        candidates.append(urlunparse(parsed._replace(netloc=parsed.netloc.replace(parsed.hostname, bare))))
+    return candidates
+
+
+async def async_probe_daytopper(hass, host, addresses=()):
+    """Probe host and its fallbacks at once, return (url, payload) of the first Daytopper.
+
+    addresses are other URLs of the same device, e.g. its IP address. When one of
+    them answers, host is still returned as the url, so the configured address
+    survives IP changes. Returns None if nothing answered within PROBE_TIMEOUT.
+    """
+    session = async_get_clientsession(hass)
+
+    async def probe(url, fetch_url):
+        try:
+            async with session.get(fetch_url) as response:
+                _LOGGER.debug("Connection test result for %s: status %s", fetch_url, response.status)
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+        except Exception as err:
+            _LOGGER.debug("Connection test failed for %s: %s", fetch_url, err)
+            return None
+        if not is_daytopper_payload(payload):
+            _LOGGER.debug("%s answered, but not like a Solar Daytopper", fetch_url)
+            return None
+        return url, payload
+
+    async def probe_resolved(url):
+        # mDNS is resolved in the executor, the other candidates do not wait for it
+        resolved_url = await resolve_mdns_url(url)
+        if not resolved_url or resolved_url == url:
+            return None
+        return await probe(url, resolved_url)
+
+    probes = [probe(url, url) for url in candidate_urls(host)]
+    probes += [probe(host, address) for address in addresses]
+    if ".local" in host:
+        probes.append(probe_resolved(host))
+
+    tasks = [asyncio.ensure_future(coro) for coro in probes]
+    try:
+        async with asyncio.timeout(PROBE_TIMEOUT):
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result is not None:
+                    _LOGGER.debug("Found Solar Daytopper at %s", result[0])
+                    return result
+    except asyncio.TimeoutError:
+        _LOGGER.debug("No Solar Daytopper answered at %s within %ss", host, PROBE_TIMEOUT)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return None
@@ -0,0 +1 @@
+"""Tests for the Solar Daytopper integration."""
@@ -0,0 +1,140 @@
+"""Fixtures for Solar Daytopper tests."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.solar_daytopper.const import DOMAIN
+
+CHIP_ID = "abc123"
+DEFAULT_INVERTERS = ("solax", "enphase")
+
+
+def make_payload(inverters=DEFAULT_INVERTERS, current=1500, total=1234567, last_api_call=None, up_since="2025-08-11 07:35:06"):
+    """Build a Daytopper payload, inverters is a list of names or a count."""
+    if isinstance(inverters, int):
+        inverters = [f"inverter{index}" for index in range(inverters)]
+
+    readings = {
+        name: {"current": current, "total": total + index}
+        for index, name in enumerate(inverters)
+    }
+    return {
+        "system": {
+            "chipId": CHIP_ID,
+            "firmwareVersion": "1.4.0",
+            "wifiStrengthRaw": -60,
+            "wifiStrength": "Good",
+            "wifiHostname": "daytopper",
+            "upSince": up_since,
+            "lastApiCall": last_api_call if last_api_call is not None else int(time.time()) - 60,
+            "ip": "192.168.1.100",
+        },
+        "solarReadingTotal": {
+            "current": sum(reading["current"] for reading in readings.values()),
+            "total": sum(reading["total"] for reading in readings.values()),
+        },
+        "solarReadings": readings,
+    }
+
+
+class FakeDaytopper:
+    """Local stand-in for the Daytopper HTTP API."""
+
+    def __init__(self):
+        self.payload = make_payload()
+        self.delay = 0
+        self.status = 200
+        self.body = None
+        self.etag = None
+        self.requests = 0
+        self.not_modified = 0
+        self.url = None
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.etag is not None:
+            if request.headers.get("If-None-Match") == self.etag:
+                self.not_modified += 1
+                return web.Response(status=304, headers={"ETag": self.etag})
+            response = web.json_response(self.payload, status=self.status)
+            response.headers["ETag"] = self.etag
+            return response
+        if self.body is not None:
+            # Raw body, e.g. to send malformed JSON
+            return web.Response(text=self.body, status=self.status, content_type="application/json")
+        return web.json_response(self.payload, status=self.status)
+
+
+@asynccontextmanager
+async def run_fake_daytopper():
+    device = FakeDaytopper()
+    app = web.Application()
+    app.router.add_get("/", device.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    device.url = f"http://127.0.0.1:{port}"
+    try:
+        yield device
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+async def fake_daytopper():
+    async with run_fake_daytopper() as device:
+        yield device
+
+
+@pytest.fixture
+def config_entry(hass, fake_daytopper):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Solar Daytopper",
+        data={"host": fake_daytopper.url},
+        unique_id=CHIP_ID,
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+class LoopLagMonitor:
+    """Measure the longest time the event loop was blocked."""
+
+    def __init__(self):
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            self.max_lag = max(self.max_lag, now - last)
+            last = now
+
+    async def __aenter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,92 @@
+"""Tests for the derived Solar Daytopper statistics."""
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_daytopper.analytics import (
+    IMBALANCE_BALANCED,
+    IMBALANCE_IDLE,
+    IMBALANCE_LOW,
+    IMBALANCE_STALLED,
+    RunningStats,
+    imbalance,
+)
+
+
+def _noon():
+    return dt_util.start_of_local_day().timestamp() + 12 * 3600
+
+
+def test_today_peak_and_average():
+    stats = RunningStats("solax")
+    start = _noon()
+
+    stats.update(start, 1000, 5000)
+    stats.update(start + 300, 3000, 5200)
+    stats.update(start + 600, 2000, 5400)
+
+    assert stats.today == 0.4
+    assert stats.peak_power == 3000
+    assert stats.peak_time == dt_util.utc_from_timestamp(start + 300)
+    assert stats.average_power == 2000.0
+
+    # Readings older than the window drop out of the average
+    stats.update(start + 1200, 0, 5400)
+    assert stats.average_power == 1000.0
+
+
+def test_counter_reset_and_new_day():
+    stats = RunningStats("solax")
+    start = _noon()
+
+    stats.update(start, 1000, 5000)
+    # A drop is only trusted once the counter keeps going up from there
+    stats.update(start + 300, 1000, 100)
+    assert stats.today == 0.0
+    stats.update(start + 600, 1000, 150)
+    assert stats.today == 0.05
+
+    stats.update(start + 13 * 3600, 0, 200)
+    assert stats.today == 0.05
+    assert stats.peak_power == 0
+
+
+def test_zero_glitch_is_not_counted():
+    stats = RunningStats("solax")
+    start = _noon()
+
+    stats.update(start, 1000, 1234650)
+    stats.update(start + 300, 1000, 0)
+    stats.update(start + 600, 1000, 1234740)
+
+    assert stats.today == 0.09
+
+
+def test_restore_bridges_the_restart():
+    before = RunningStats("solax")
+    start = _noon()
+    before.update(start, 1000, 5000)
+    before.update(start + 300, 1000, 5100)
+
+    after = RunningStats("solax")
+    after.update(start + 900, 500, 5300)
+    after.restore(before.as_dict())
+
+    assert after.today == 0.3
+    assert after.peak_power == 1000
+
+
+def test_stale_reading_is_ignored():
+    stats = RunningStats("solax")
+    start = _noon()
+    stats.update(start, 1000, 5000)
+    stats.update(start, 2000, 5000)
+
+    assert stats.peak_power == 1000
+    assert stats.average_power == 1000.0
+
+
+def test_imbalance():
+    assert imbalance(0, 0, 2) == IMBALANCE_IDLE
+    assert imbalance(1000, 2000, 2) == IMBALANCE_BALANCED
+    assert imbalance(400, 2000, 2) == IMBALANCE_LOW
+    assert imbalance(0, 2000, 2) == IMBALANCE_STALLED
+    assert imbalance(1000, 1000, 1) == IMBALANCE_BALANCED
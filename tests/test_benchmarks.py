@@ -0,0 +1,118 @@
+"""Benchmarks of the poll path against the fake Daytopper.
+
+Every benchmark runs at 1, 50 and 500 inverters and fails when it exceeds
+its budget, so a regression in poll latency, event loop blocking or CPU per
+update shows up. They are skipped by a plain pytest run, as the budgets
+depend on the machine. Run them with: pytest -m benchmark -s
+"""
+import time
+
+import pytest
+
+from custom_components.solar_daytopper.const import DOMAIN
+from custom_components.solar_daytopper.coordinator import DaytopperCoordinator
+from custom_components.solar_daytopper.fetcher import DaytopperFetcher
+
+from .conftest import LoopLagMonitor, make_payload
+
+pytestmark = pytest.mark.benchmark
+
+INVERTER_COUNTS = (1, 50, 500)
+
+# Budgets in seconds, per inverter count
+FETCH_BUDGET = {1: 0.25, 50: 0.5, 500: 2.0}
+# The body still has to be read and hashed, but is not decoded again
+UNCHANGED_FETCH_BUDGET = {1: 0.25, 50: 0.25, 500: 0.5}
+FETCH_LOOP_LAG_BUDGET = {1: 0.05, 50: 0.05, 500: 0.2}
+SETUP_BUDGET = {1: 2.0, 50: 5.0, 500: 30.0}
+UPDATE_BUDGET = {1: 0.01, 50: 0.1, 500: 1.0}
+READ_BUDGET = {1: 0.01, 50: 0.05, 500: 0.5}
+
+FETCH_ROUNDS = 10
+READ_ROUNDS = 100
+
+
+def _report(name, inverters, seconds):
+    print(f"\n{name} [{inverters} inverter(s)]: {seconds * 1000:.2f} ms")
+
+
+@pytest.mark.parametrize("inverters", INVERTER_COUNTS)
+async def test_benchmark_fetch(hass, fake_daytopper, inverters):
+    fake_daytopper.payload = make_payload(inverters)
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, fake_daytopper.url, fetcher)
+
+    try:
+        async with LoopLagMonitor() as monitor:
+            start = time.perf_counter()
+            for _ in range(FETCH_ROUNDS):
+                # A new reading every round, so every body is decoded and validated
+                fake_daytopper.payload["system"]["lastApiCall"] += 300
+                await coordinator.async_refresh()
+            elapsed = (time.perf_counter() - start) / FETCH_ROUNDS
+    finally:
+        await fetcher.async_close()
+
+    assert coordinator.last_update_success
+    assert coordinator.metrics.unchanged == 0
+    _report("fetch", inverters, elapsed)
+    _report("fetch max loop lag", inverters, monitor.max_lag)
+    assert elapsed < FETCH_BUDGET[inverters]
+    assert monitor.max_lag < FETCH_LOOP_LAG_BUDGET[inverters]
+
+
+@pytest.mark.parametrize("inverters", INVERTER_COUNTS)
+async def test_benchmark_fetch_unchanged(hass, fake_daytopper, inverters):
+    fake_daytopper.payload = make_payload(inverters)
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, fake_daytopper.url, fetcher)
+
+    try:
+        await coordinator.async_refresh()
+        start = time.perf_counter()
+        for _ in range(FETCH_ROUNDS):
+            await coordinator.async_refresh()
+        elapsed = (time.perf_counter() - start) / FETCH_ROUNDS
+    finally:
+        await fetcher.async_close()
+
+    assert coordinator.metrics.unchanged == FETCH_ROUNDS
+    _report("unchanged fetch", inverters, elapsed)
+    assert elapsed < UNCHANGED_FETCH_BUDGET[inverters]
+
+
+@pytest.mark.parametrize("inverters", INVERTER_COUNTS)
+async def test_benchmark_setup_and_updates(hass, config_entry, fake_daytopper, inverters):
+    fake_daytopper.payload = make_payload(inverters)
+
+    start = time.perf_counter()
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    setup = time.perf_counter() - start
+
+    sensors = hass.states.async_all("sensor")
+    assert len(sensors) > inverters * 2
+    _report("setup", inverters, setup)
+    assert setup < SETUP_BUDGET[inverters]
+
+    # One coordinator update that changes every inverter value
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    payload = make_payload(inverters, current=1600, total=1300000)
+    start = time.perf_counter()
+    coordinator.async_set_updated_data(payload)
+    update = time.perf_counter() - start
+    _report("fan-out update", inverters, update)
+    assert update < UPDATE_BUDGET[inverters]
+
+    # State reads by the frontend and recorder
+    component = hass.data["sensor"]
+    entities = [component.get_entity(state.entity_id) for state in sensors]
+    start = time.perf_counter()
+    for _ in range(READ_ROUNDS):
+        for entity in entities:
+            entity.native_value
+    reads = (time.perf_counter() - start) / READ_ROUNDS
+    _report("native_value reads", inverters, reads)
+    assert reads < READ_BUDGET[inverters]
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
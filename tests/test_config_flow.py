@@ -0,0 +1,74 @@
+"""Tests for the Solar Daytopper config flow."""
+from ipaddress import ip_address
+from unittest.mock import patch
+
+from homeassistant import config_entries
+from homeassistant.components.zeroconf import ZeroconfServiceInfo
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.solar_daytopper.const import DOMAIN
+
+from .conftest import CHIP_ID
+
+
+async def _user_flow(hass, host):
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    with patch("custom_components.solar_daytopper.async_setup_entry", return_value=True):
+        return await hass.config_entries.flow.async_configure(result["flow_id"], {"host": host})
+
+
+async def test_user_flow(hass, fake_daytopper):
+    result = await _user_flow(hass, fake_daytopper.url + "/")
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["title"] == "Solar Daytopper (daytopper)"
+    assert result["data"] == {"host": fake_daytopper.url}
+    assert result["result"].unique_id == CHIP_ID
+
+
+async def test_user_flow_rejects_other_devices(hass, fake_daytopper):
+    fake_daytopper.body = '{"status": "ok"}'
+
+    result = await _user_flow(hass, fake_daytopper.url)
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"host": "cannot_connect"}
+
+
+async def test_zeroconf_flow_keeps_the_mdns_name(hass, fake_daytopper):
+    port = int(fake_daytopper.url.rsplit(":", 1)[1])
+    discovery_info = ZeroconfServiceInfo(
+        ip_address=ip_address("127.0.0.1"),
+        ip_addresses=[ip_address("127.0.0.1")],
+        hostname="daytopper.local.",
+        name="daytopper._http._tcp.local.",
+        port=port,
+        type="_http._tcp.local.",
+        properties={},
+    )
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_ZEROCONF}, data=discovery_info
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["step_id"] == "zeroconf_confirm"
+
+    with patch("custom_components.solar_daytopper.async_setup_entry", return_value=True):
+        result = await hass.config_entries.flow.async_configure(result["flow_id"], {})
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"] == {"host": f"http://daytopper.local:{port}"}
+    assert result["result"].unique_id == CHIP_ID
+
+
+async def test_options_flow_rejects_another_device(hass, config_entry, fake_daytopper):
+    fake_daytopper.payload["system"]["chipId"] = "def456"
+
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"host": fake_daytopper.url, "replay_mode": "off"}
+    )
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"host": "wrong_device"}
+    assert config_entry.data["host"] == fake_daytopper.url
@@ -0,0 +1,169 @@
+"""Tests for the Solar Daytopper fetch path."""
+import time
+from unittest.mock import patch
+
+from custom_components.solar_daytopper.coordinator import DaytopperCoordinator
+from custom_components.solar_daytopper.fetcher import DaytopperFetcher
+
+from .conftest import make_payload
+
+
+async def _refresh(hass, url, timeout=2):
+    fetcher = DaytopperFetcher(timeout=timeout)
+    coordinator = DaytopperCoordinator(hass, url, fetcher)
+    try:
+        await coordinator.async_refresh()
+    finally:
+        await fetcher.async_close()
+    return coordinator
+
+
+async def test_fetch_decodes_payload(hass, fake_daytopper):
+    fake_daytopper.payload = make_payload(3)
+
+    coordinator = await _refresh(hass, fake_daytopper.url)
+
+    assert coordinator.last_update_success
+    assert coordinator.snapshot.chip_id == "abc123"
+    assert coordinator.snapshot.inverters == ("inverter0", "inverter1", "inverter2")
+    assert "_last_update" in coordinator.data
+
+
+async def test_fetch_timeout(hass, fake_daytopper):
+    fake_daytopper.delay = 1
+
+    coordinator = await _refresh(hass, fake_daytopper.url, timeout=0.1)
+
+    assert not coordinator.last_update_success
+    assert coordinator.data is None
+
+
+async def test_fetch_malformed_json(hass, fake_daytopper):
+    fake_daytopper.body = "{not json"
+
+    coordinator = await _refresh(hass, fake_daytopper.url)
+
+    assert not coordinator.last_update_success
+
+
+async def test_fetch_non_dict_payload(hass, fake_daytopper):
+    fake_daytopper.body = "[1, 2, 3]"
+
+    coordinator = await _refresh(hass, fake_daytopper.url)
+
+    assert not coordinator.last_update_success
+
+
+async def test_fetch_http_error(hass, fake_daytopper):
+    fake_daytopper.status = 500
+
+    coordinator = await _refresh(hass, fake_daytopper.url)
+
+    assert not coordinator.last_update_success
+
+
+async def test_failures_back_off(hass, fake_daytopper):
+    fake_daytopper.status = 503
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, fake_daytopper.url, fetcher)
+    try:
+        await coordinator.async_refresh()
+        first = coordinator.update_interval
+        await coordinator.async_refresh()
+        second = coordinator.update_interval
+    finally:
+        await fetcher.async_close()
+
+    assert second > first
+
+
+async def test_fetch_local_hostname_is_resolved_once(hass, fake_daytopper):
+    port = fake_daytopper.url.rsplit(":", 1)[1]
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, f"http://daytopper.local:{port}", fetcher)
+
+    with patch(
+        "custom_components.solar_daytopper.utils.socket.gethostbyname",
+        return_value="127.0.0.1",
+    ) as gethostbyname:
+        try:
+            await coordinator.async_refresh()
+            await coordinator.async_refresh()
+        finally:
+            await fetcher.async_close()
+
+    assert coordinator.last_update_success
+    assert fake_daytopper.requests == 2
+    gethostbyname.assert_called_once_with("daytopper.local")
+
+
+async def test_slow_resolution_times_out(hass, fake_daytopper):
+    fetcher = DaytopperFetcher(timeout=0.1)
+    coordinator = DaytopperCoordinator(hass, "http://daytopper.local", fetcher)
+
+    def slow_gethostbyname(hostname):
+        time.sleep(0.5)
+        return "127.0.0.1"
+
+    with patch("custom_components.solar_daytopper.utils.socket.gethostbyname", slow_gethostbyname):
+        started = time.perf_counter()
+        try:
+            await coordinator.async_refresh()
+        finally:
+            await fetcher.async_close()
+
+    assert not coordinator.last_update_success
+    assert time.perf_counter() - started < 0.4
+
+
+async def test_unchanged_payload_is_not_decoded_again(hass, fake_daytopper):
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, fake_daytopper.url, fetcher)
+    try:
+        await coordinator.async_refresh()
+        first = coordinator.data
+        last_update = first["_last_update"]
+        await coordinator.async_refresh()
+    finally:
+        await fetcher.async_close()
+
+    assert coordinator.data is first
+    assert coordinator.data["_last_update"] == last_update
+    assert coordinator.metrics.unchanged == 1
+    assert "decode" not in coordinator.metrics.polls[-1]
+
+
+async def test_unchanged_last_api_call_is_not_decoded_again(hass, fake_daytopper):
+    fake_daytopper.payload = make_payload(last_api_call=1700000000)
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, fake_daytopper.url, fetcher)
+    try:
+        await coordinator.async_refresh()
+        first = coordinator.data
+        fake_daytopper.payload = make_payload(current=1600, last_api_call=1700000000)
+        await coordinator.async_refresh()
+        assert coordinator.data is first
+
+        fake_daytopper.payload = make_payload(current=1600, last_api_call=1700000300)
+        await coordinator.async_refresh()
+    finally:
+        await fetcher.async_close()
+
+    assert coordinator.data is not first
+    assert coordinator.data["solarReadingTotal"]["current"] == 3200
+
+
+async def test_etag_is_sent_back(hass, fake_daytopper):
+    fake_daytopper.etag = '"v1"'
+    fetcher = DaytopperFetcher()
+    coordinator = DaytopperCoordinator(hass, fake_daytopper.url, fetcher)
+    try:
+        await coordinator.async_refresh()
+        first = coordinator.data
+        await coordinator.async_refresh()
+    finally:
+        await fetcher.async_close()
+
+    assert coordinator.last_update_success
+    assert fake_daytopper.not_modified == 1
+    assert coordinator.data is first
@@ -0,0 +1,71 @@
+"""Tests for the Solar Daytopper poll diagnostics."""
+from custom_components.solar_daytopper.const import DOMAIN
+from custom_components.solar_daytopper.diagnostics import async_get_config_entry_diagnostics
+
+from .conftest import make_payload
+
+
+async def test_diagnostics_contain_poll_timings(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert diagnostics["entry"]["data"]["host"] == "**REDACTED**"
+    assert diagnostics["data"]["system"]["chipId"] == "**REDACTED**"
+    poll = diagnostics["poll"]
+    assert poll["successes"] == 1
+    assert poll["failures"] == 0
+    last = poll["polls"][-1]
+    assert last["success"] is True
+    assert last["size"] > 0
+    for phase in ("resolve", "response", "decode", "fan_out", "total"):
+        assert last[phase] >= 0
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_poll_sensors(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_poll_successes").state == "1"
+    assert hass.states.get("sensor.solar_daytopper_poll_failures").state == "0"
+    assert float(hass.states.get("sensor.solar_daytopper_payload_size").state) > 0
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_poll_sensors_update_during_outage(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    fake_daytopper.status = 503
+    await coordinator.async_refresh()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert not coordinator.last_update_success
+    assert hass.states.get("sensor.solar_daytopper_poll_failures").state == "2"
+    assert hass.states.get("sensor.solar_daytopper_poll_successes").state == "1"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_push_fan_out_is_not_added_to_a_poll(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    # Unchanged poll, nothing is fanned out
+    await coordinator.async_refresh()
+    assert coordinator.async_push(make_payload(current=2000))
+    await hass.async_block_till_done()
+
+    first, unchanged = coordinator.metrics.polls
+    assert first["fan_out"] >= 0
+    assert unchanged["unchanged"]
+    assert "fan_out" not in unchanged
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
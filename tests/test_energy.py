@@ -0,0 +1,93 @@
+"""Tests for the gap-aware Solar Daytopper energy accounting."""
+import pytest
+
+from custom_components.solar_daytopper.energy import EnergyAccumulator
+
+
+def test_counter_delta_is_used():
+    accumulator = EnergyAccumulator("solax")
+
+    assert not accumulator.update(0, 1000, 5000, "boot")
+    assert accumulator.update(300, 1000, 5090, "boot")
+
+    assert accumulator.energy == pytest.approx(0.09)
+
+
+def test_zero_glitch_is_not_counted():
+    accumulator = EnergyAccumulator("solax")
+
+    accumulator.update(0, 1000, 1234650, "boot")
+    accumulator.update(300, 1000, 0, "boot")
+    accumulator.update(600, 1000, 1234740, "boot")
+
+    # Power bridges the glitch, the recovered counter only adds the rest
+    assert accumulator.energy == pytest.approx(0.09)
+    assert accumulator.counter.mark == 1234740
+
+
+def test_reboot_integrates_power():
+    accumulator = EnergyAccumulator("solax")
+
+    accumulator.update(0, 1000, 5000, "boot")
+    accumulator.update(300, 1000, 10, "reboot")
+    accumulator.update(600, 1000, 100, "reboot")
+
+    assert accumulator.energy == pytest.approx(1000 * 300 / 3600 / 1000 + 0.09)
+
+
+def test_counter_reset_without_reboot():
+    accumulator = EnergyAccumulator("solax")
+
+    accumulator.update(0, None, 5000, None)
+    accumulator.update(300, None, 10, None)
+    assert accumulator.energy == 0
+
+    # Still below the old counter and going up, so it was reset
+    accumulator.update(600, None, 40, None)
+    assert accumulator.energy == pytest.approx(0.03)
+
+
+def test_long_gap():
+    accumulator = EnergyAccumulator("solax")
+    accumulator.update(0, 1000, 5000, "boot")
+
+    # The counter covers any gap
+    accumulator.update(7200, 1000, 8000, "boot")
+    assert accumulator.energy == pytest.approx(3.0)
+
+    # Too long to integrate power, only the new counter is known
+    accumulator.update(14400, 1000, 500, "reboot")
+    assert accumulator.energy == pytest.approx(3.5)
+
+    # Nothing usable at all
+    assert not accumulator.update(21600, 1000, None, "reboot")
+    assert accumulator.energy == pytest.approx(3.5)
+
+
+def test_restore_bridges_the_restart():
+    before = EnergyAccumulator("solax")
+    before.update(0, 1000, 5000, "boot")
+    before.update(300, 1000, 5100, "boot")
+    stored = dict(before.as_dict(), energy=1.0)
+
+    after = EnergyAccumulator("solax")
+    after.update(600, 1000, 5200, "boot")
+    after.restore(stored)
+    assert after.energy == pytest.approx(1.1)
+
+    after.update(900, 1000, 5300, "boot")
+    assert after.energy == pytest.approx(1.2)
+
+
+def test_restore_with_zero_glitch():
+    before = EnergyAccumulator("solax")
+    before.update(300, 1000, 5100, "boot")
+    stored = dict(before.as_dict(), energy=1.0)
+
+    after = EnergyAccumulator("solax")
+    after.update(600, 1000, 0, "boot")
+    after.restore(stored)
+    assert after.counter.mark == 5100
+
+    after.update(900, 1000, 5300, "boot")
+    assert after.energy == pytest.approx(1.2)
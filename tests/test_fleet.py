@@ -0,0 +1,105 @@
+"""Tests for the shared poll schedule of all Solar Daytoppers."""
+from collections import Counter
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry, async_fire_time_changed
+
+from custom_components.solar_daytopper.const import DOMAIN, DATA_FLEET, FLEET_TICK, SCAN_INTERVAL
+from custom_components.solar_daytopper.fleet import DaytopperFleet
+
+from .conftest import make_payload, run_fake_daytopper
+
+
+async def test_polls_are_spread_over_the_interval(hass):
+    fleet = DaytopperFleet(hass, None)
+    coordinators = [object() for _ in range(120)]
+
+    for coordinator in coordinators:
+        fleet.async_schedule(coordinator, timedelta(seconds=10))
+
+    ticks = Counter(round(fleet.next_poll(coordinator) / FLEET_TICK) for coordinator in coordinators)
+    assert max(ticks.values()) == 2
+    assert max(fleet.next_poll(coordinator) for coordinator in coordinators) < SCAN_INTERVAL.total_seconds() + 10
+
+    fleet.async_cancel(coordinators[0])
+    assert fleet.next_poll(coordinators[0]) is None
+    fleet.async_shutdown()
+
+
+async def test_devices_are_polled_by_the_fleet(hass, config_entry, fake_daytopper):
+    async with run_fake_daytopper() as other_daytopper:
+        other_daytopper.payload = make_payload(["growatt"])
+        other_daytopper.payload["system"]["chipId"] = "def456"
+        other_entry = MockConfigEntry(
+            domain=DOMAIN,
+            title="Solar Daytopper 2",
+            data={"host": other_daytopper.url},
+            unique_id="def456",
+        )
+        other_entry.add_to_hass(hass)
+
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        assert await hass.config_entries.async_setup(other_entry.entry_id)
+        await hass.async_block_till_done()
+        fleet = hass.data[DATA_FLEET]
+        assert fleet.users == {config_entry.entry_id, other_entry.entry_id}
+
+        # The two devices are due together, so they are polled in consecutive ticks
+        for _ in range(2):
+            async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL + timedelta(seconds=2 * FLEET_TICK))
+            await hass.async_block_till_done()
+
+        assert fake_daytopper.requests == 2
+        assert other_daytopper.requests == 2
+
+        assert await hass.config_entries.async_unload(other_entry.entry_id)
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert DATA_FLEET not in hass.data
+
+
+async def test_push_moves_device_to_a_later_tick(hass, config_entry, fake_daytopper, caplog):
+    async with run_fake_daytopper() as other_daytopper:
+        other_daytopper.payload["system"]["chipId"] = "def456"
+        other_entry = MockConfigEntry(
+            domain=DOMAIN,
+            title="Solar Daytopper 2",
+            data={"host": other_daytopper.url},
+            unique_id="def456",
+        )
+        other_entry.add_to_hass(hass)
+
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        assert await hass.config_entries.async_setup(other_entry.entry_id)
+        await hass.async_block_till_done()
+        fleet = hass.data[DATA_FLEET]
+        coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+        other_coordinator = hass.data[DOMAIN][other_entry.entry_id]["coordinator"]
+
+        # A pushed reading moves the first device, due first, well past the second
+        coordinator.update_interval = timedelta(seconds=600)
+        coordinator.async_set_updated_data(make_payload(current=2000))
+        assert fleet.next_poll(coordinator) > fleet.next_poll(other_coordinator) + SCAN_INTERVAL.total_seconds() / 2
+
+        for _ in range(2):
+            async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL + timedelta(seconds=2 * FLEET_TICK))
+            await hass.async_block_till_done()
+
+        assert fake_daytopper.requests == 1
+        assert other_daytopper.requests == 2
+        assert "Error" not in caplog.text
+
+        assert await hass.config_entries.async_unload(other_entry.entry_id)
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_disabled_polling_is_not_scheduled(hass, config_entry, fake_daytopper):
+    hass.config_entries.async_update_entry(config_entry, pref_disable_polling=True)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    assert fake_daytopper.requests == 1
+    assert hass.data[DATA_FLEET].next_poll(coordinator) is None
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
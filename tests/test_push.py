@@ -0,0 +1,40 @@
+"""Tests for the Solar Daytopper push mode."""
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.solar_daytopper.const import (
+    DOMAIN,
+    CONF_PUSH_MODE,
+    CONF_WEBHOOK_ID,
+    PUSH_FALLBACK_INTERVAL,
+)
+
+from .conftest import CHIP_ID, make_payload
+
+WEBHOOK_ID = "daytopper_test_webhook"
+
+
+async def test_push_updates_sensors(hass, hass_client_no_auth, fake_daytopper):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"host": fake_daytopper.url},
+        options={CONF_PUSH_MODE: True, CONF_WEBHOOK_ID: WEBHOOK_ID},
+        unique_id=CHIP_ID,
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    client = await hass_client_no_auth()
+    response = await client.post(f"/api/webhook/{WEBHOOK_ID}", json=make_payload(current=2000))
+    assert response.status == 200
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_solax_current").state == "2000"
+    assert coordinator.update_interval == PUSH_FALLBACK_INTERVAL
+    assert fake_daytopper.requests == 1
+
+    response = await client.post(f"/api/webhook/{WEBHOOK_ID}", data="not json")
+    assert response.status == 400
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,114 @@
+"""Tests for the Solar Daytopper replay mode."""
+import json
+
+from homeassistant.helpers import device_registry as dr
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.solar_daytopper.const import (
+    DOMAIN,
+    SCAN_INTERVAL,
+    CONF_REPLAY_MODE,
+    CONF_REPLAY_FILE,
+    CONF_REPLAY_INVERTERS,
+    CONF_REPLAY_SPEED,
+    REPLAY_FILE,
+    REPLAY_OFF,
+    REPLAY_SYNTHETIC,
+)
+from custom_components.solar_daytopper.replay import replay_chip_id, solar_curve
+
+from .conftest import CHIP_ID, make_payload
+
+
+def _replay_entry(hass, **options):
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Solar Daytopper",
+        data={"host": "http://daytopper.invalid"},
+        options=options,
+        unique_id=CHIP_ID,
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+def test_solar_curve():
+    midnight = dt_util.start_of_local_day()
+
+    assert solar_curve(midnight.replace(hour=12).timestamp()) == 1.0
+    assert solar_curve(midnight.timestamp()) == 0.0
+
+
+async def test_synthetic_replay(hass):
+    entry = _replay_entry(hass, **{
+        CONF_REPLAY_MODE: REPLAY_SYNTHETIC,
+        CONF_REPLAY_INVERTERS: 5,
+        CONF_REPLAY_SPEED: 300,
+    })
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    assert coordinator.update_interval.total_seconds() == 1
+    # Replay has its own identity, next to the real device
+    assert coordinator.snapshot.chip_id == replay_chip_id(entry.entry_id)
+    assert len(coordinator.snapshot.inverters) == 5
+    assert hass.states.get("sensor.solar_daytopper_inverter4_current") is not None
+    assert hass.states.get("sensor.solar_daytopper_replay_throughput") is not None
+    assert hass.states.get("sensor.solar_daytopper_event_loop_lag") is not None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_file_replay_loops_with_its_own_clock(hass, tmp_path):
+    recording = tmp_path / "recording.ndjson"
+    recording.write_text(
+        "\n".join(json.dumps(make_payload(current=current)) for current in (1000, 2000)) + "\n"
+    )
+    entry = _replay_entry(hass, **{
+        CONF_REPLAY_MODE: REPLAY_FILE,
+        CONF_REPLAY_FILE: str(recording),
+    })
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    first = coordinator.data["system"]["lastApiCall"]
+    assert coordinator.data["system"]["chipId"] == replay_chip_id(entry.entry_id)
+
+    currents = [coordinator.data["solarReadings"]["solax"]["current"]]
+    for _ in range(2):
+        await coordinator.async_refresh()
+        currents.append(coordinator.data["solarReadings"]["solax"]["current"])
+
+    assert currents == [1000, 2000, 1000]
+    assert coordinator.data["system"]["lastApiCall"] == first + 2 * SCAN_INTERVAL.total_seconds()
+    assert hass.states.get("sensor.solar_daytopper_solax_current").state == "1000"
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_replay_device_removed_when_switched_off(hass, config_entry, fake_daytopper):
+    hass.config_entries.async_update_entry(
+        config_entry, options={CONF_REPLAY_MODE: REPLAY_SYNTHETIC, CONF_REPLAY_INVERTERS: 2}
+    )
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    registry = dr.async_get(hass)
+    replay_identifiers = {(DOMAIN, replay_chip_id(config_entry.entry_id))}
+    assert registry.async_get_device(identifiers=replay_identifiers) is not None
+    assert registry.async_get_device(identifiers={(DOMAIN, CHIP_ID)}) is None
+    assert fake_daytopper.requests == 0
+
+    hass.config_entries.async_update_entry(config_entry, options={CONF_REPLAY_MODE: REPLAY_OFF})
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert registry.async_get_device(identifiers=replay_identifiers) is None
+    assert registry.async_get_device(identifiers={(DOMAIN, CHIP_ID)}) is not None
+    assert hass.states.get("sensor.solar_daytopper_solax_current").state == "1500"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
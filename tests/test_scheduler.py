@@ -0,0 +1,71 @@
+"""Tests for the adaptive Solar Daytopper poll schedule."""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_daytopper.const import (
+    SCAN_INTERVAL,
+    NIGHT_SCAN_INTERVAL,
+    IDLE_SCAN_INTERVAL,
+    POLL_ALIGN_MARGIN,
+)
+from custom_components.solar_daytopper.scheduler import PollScheduler
+
+from .conftest import make_payload
+
+SCHEDULER = "custom_components.solar_daytopper.scheduler"
+
+
+def _daytime():
+    return patch(f"{SCHEDULER}.is_up", return_value=True)
+
+
+async def test_poll_is_aligned_to_the_device_upload(hass, freezer):
+    now = dt_util.utcnow().timestamp()
+    scheduler = PollScheduler(hass)
+
+    with _daytime():
+        aligned = scheduler.next_after_success(make_payload(last_api_call=now - 60))
+        # Too close to the next upload, wait for the one after it
+        skipped = scheduler.next_after_success(make_payload(last_api_call=now - 290))
+        # Device clock ahead of ours
+        future = scheduler.next_after_success(make_payload(last_api_call=now + 3600))
+
+    margin = POLL_ALIGN_MARGIN.total_seconds()
+    assert aligned.total_seconds() == pytest.approx(SCAN_INTERVAL.total_seconds() + margin - 60)
+    assert skipped.total_seconds() == pytest.approx(2 * SCAN_INTERVAL.total_seconds() + margin - 290)
+    assert future == SCAN_INTERVAL
+
+
+async def test_idle_backoff(hass):
+    scheduler = PollScheduler(hass)
+
+    with _daytime():
+        payload = make_payload(current=0)
+        delays = [scheduler.next_after_success(payload) for _ in range(3)]
+        # The same payload again is not another reading without production
+        assert IDLE_SCAN_INTERVAL not in delays
+        assert scheduler.zero_streak == 1
+
+        for _ in range(2):
+            delay = scheduler.next_after_success(make_payload(current=0))
+        assert delay == IDLE_SCAN_INTERVAL
+
+        assert scheduler.next_after_success(make_payload()) != IDLE_SCAN_INTERVAL
+        assert scheduler.zero_streak == 0
+
+
+async def test_night_backoff(hass, freezer):
+    scheduler = PollScheduler(hass)
+    now = dt_util.utcnow()
+
+    with patch(f"{SCHEDULER}.is_up", return_value=False), patch(f"{SCHEDULER}.get_astral_event_next") as sunrise:
+        sunrise.return_value = now + timedelta(hours=6)
+        assert scheduler.next_after_success(make_payload(current=0)) == NIGHT_SCAN_INTERVAL
+
+        # Back in time for sunrise
+        sunrise.return_value = now + timedelta(minutes=5)
+        assert scheduler.next_after_success(make_payload(current=0)) == timedelta(minutes=5) + POLL_ALIGN_MARGIN
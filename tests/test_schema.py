@@ -0,0 +1,62 @@
+"""Tests for the Solar Daytopper payload schema."""
+import logging
+
+from custom_components.solar_daytopper.schema import PayloadSchema
+
+from .conftest import make_payload
+
+
+def test_valid_payload_is_untouched():
+    schema = PayloadSchema("daytopper")
+    payload = make_payload()
+    expected = make_payload(last_api_call=payload["system"]["lastApiCall"])
+
+    assert schema.validate(payload)
+    assert payload == expected
+
+
+def test_invalid_fields_keep_last_good_value():
+    schema = PayloadSchema("daytopper")
+    assert schema.validate(make_payload(current=1500))
+
+    payload = make_payload(current=1600)
+    payload["solarReadings"]["solax"]["current"] = "n/a"
+    payload["solarReadings"]["enphase"]["total"] = -1
+    payload["system"]["upSince"] = "yesterday"
+    assert schema.validate(payload)
+
+    assert payload["solarReadings"]["solax"]["current"] == 1500
+    assert payload["solarReadings"]["enphase"]["current"] == 1600
+    assert payload["solarReadings"]["enphase"]["total"] == 1234568
+    assert payload["system"]["upSince"] == "2025-08-11 07:35:06"
+
+
+def test_invalid_field_without_last_good_value_is_dropped():
+    schema = PayloadSchema("daytopper")
+    payload = make_payload()
+    payload["system"]["wifiStrengthRaw"] = True
+    payload["solarReadings"]["growatt"] = "offline"
+
+    assert schema.validate(payload)
+    assert "wifiStrengthRaw" not in payload["system"]
+    assert "growatt" not in payload["solarReadings"]
+
+
+def test_payload_without_known_fields_is_rejected():
+    schema = PayloadSchema("daytopper")
+
+    assert not schema.validate({"status": "ok"})
+    assert not schema.validate({"system": "broken"})
+
+
+def test_warnings_are_rate_limited(caplog):
+    schema = PayloadSchema("daytopper")
+    caplog.set_level(logging.WARNING)
+
+    for _ in range(10):
+        payload = make_payload()
+        payload["solarReadings"]["solax"]["current"] = "n/a"
+        schema.validate(payload)
+
+    warnings = [record for record in caplog.records if "solarReadings.solax.current" in record.getMessage()]
+    assert len(warnings) == 1
@@ -0,0 +1,199 @@
+"""Tests for the Solar Daytopper sensors."""
+from datetime import timedelta
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.solar_daytopper.const import (
+    DOMAIN,
+    FLEET_TICK,
+    CONF_DEADBAND_WATTS,
+    CONF_DEADBAND_PERCENT,
+)
+
+from .conftest import make_payload
+
+
+async def test_setup_creates_sensors(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_current").state == "3000"
+    assert hass.states.get("sensor.solar_daytopper_total").state == "2469.135"
+    assert hass.states.get("sensor.solar_daytopper_solax_current").state == "1500"
+    assert hass.states.get("sensor.solar_daytopper_enphase_total").state == "1234.568"
+    assert hass.states.get("sensor.solar_daytopper_hostname").state == "daytopper"
+
+    registry = er.async_get(hass)
+    entity = registry.async_get("sensor.solar_daytopper_solax_current")
+    assert entity.unique_id == "solar_daytopper_abc123_solar_daytopper_solax_current"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_derived_sensors(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    payload = make_payload()
+    payload["system"]["lastApiCall"] += 300
+    payload["solarReadings"]["enphase"]["current"] = 400
+    payload["solarReadings"]["enphase"]["total"] += 100
+    payload["solarReadingTotal"] = {"current": 1900, "total": payload["solarReadingTotal"]["total"] + 100}
+    coordinator.async_set_updated_data(payload)
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_solax_share").state == "78.9"
+    assert hass.states.get("sensor.solar_daytopper_enphase_imbalance").state == "low"
+    assert hass.states.get("sensor.solar_daytopper_enphase_today").state == "0.1"
+    assert hass.states.get("sensor.solar_daytopper_enphase_average_power").state == "950.0"
+    assert hass.states.get("sensor.solar_daytopper_peak_power").state == "3000"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def _solax_current_states(hass, config_entry, currents):
+    """Push a reading per current and return the written solax power states."""
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    states = []
+    for current in currents:
+        coordinator.async_set_updated_data(make_payload(current=current))
+        await hass.async_block_till_done()
+        states.append(hass.states.get("sensor.solar_daytopper_solax_current").state)
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    return states
+
+
+async def test_absolute_deadband(hass, config_entry, fake_daytopper):
+    hass.config_entries.async_update_entry(config_entry, options={CONF_DEADBAND_WATTS: 50})
+
+    states = await _solax_current_states(hass, config_entry, [1530, 1560, 1540, 0, 20])
+
+    # Production stopping and starting is always written
+    assert states == ["1500", "1560", "1560", "0", "20"]
+
+
+async def test_percent_deadband(hass, config_entry, fake_daytopper):
+    hass.config_entries.async_update_entry(config_entry, options={CONF_DEADBAND_PERCENT: 10})
+
+    states = await _solax_current_states(hass, config_entry, [1600, 1700, 1650])
+
+    assert states == ["1500", "1700", "1700"]
+
+
+async def test_total_never_decreases(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    coordinator.async_set_updated_data(make_payload(total=0))
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_solax_total").state == "1234.567"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_unavailable_when_fetch_fails(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    fake_daytopper.status = 500
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_current").state == STATE_UNAVAILABLE
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_legacy_unique_ids_are_migrated(hass, config_entry, fake_daytopper):
+    registry = er.async_get(hass)
+    registry.async_get_or_create(
+        "sensor",
+        DOMAIN,
+        "solar_daytopper_solar_daytopper_current",
+        config_entry=config_entry,
+    )
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert registry.async_get_entity_id(
+        "sensor", DOMAIN, "solar_daytopper_abc123_solar_daytopper_current"
+    )
+    assert not registry.async_get_entity_id(
+        "sensor", DOMAIN, "solar_daytopper_solar_daytopper_current"
+    )
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_new_inverter_is_discovered(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    assert hass.states.get("sensor.solar_daytopper_growatt_current") is None
+
+    coordinator.async_set_updated_data(make_payload(["solax", "enphase", "growatt"]))
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_growatt_current").state == "1500"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_vanished_inverter_is_unavailable(hass, config_entry, fake_daytopper):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    coordinator.async_set_updated_data(make_payload(["solax"]))
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_solax_current").state == "1500"
+    assert hass.states.get("sensor.solar_daytopper_enphase_current").state == STATE_UNAVAILABLE
+    assert hass.states.get("sensor.solar_daytopper_enphase_energy").state == STATE_UNAVAILABLE
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_setup_from_cache_while_offline(hass, hass_storage, config_entry, fake_daytopper):
+    key = f"{DOMAIN}.cache.{config_entry.entry_id}"
+    hass_storage[key] = {
+        "version": 1,
+        "minor_version": 1,
+        "key": key,
+        "data": {"data": make_payload(), "inverters": ["solax", "enphase", "growatt"]},
+    }
+    fake_daytopper.status = 500
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    # The cached reading may be hours old, so it is not shown as current
+    assert hass.states.get("sensor.solar_daytopper_current").state == STATE_UNAVAILABLE
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2 * FLEET_TICK))
+    await hass.async_block_till_done()
+
+    # Entities of every cached inverter exist, and stay unavailable after a failed poll
+    assert hass.states.get("sensor.solar_daytopper_growatt_current") is not None
+    assert hass.states.get("sensor.solar_daytopper_current").state == STATE_UNAVAILABLE
+
+    fake_daytopper.status = 200
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.solar_daytopper_current").state == "3000"
+    assert hass.states.get("sensor.solar_daytopper_growatt_current").state == STATE_UNAVAILABLE
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
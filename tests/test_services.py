@@ -0,0 +1,123 @@
+"""Tests for the Solar Daytopper services."""
+import csv
+import json
+import time
+
+import pytest
+
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.util import dt as dt_util
+
+from custom_components.solar_daytopper.const import DOMAIN
+
+from .conftest import make_payload
+
+
+async def _setup_with_history(hass, config_entry, totals=(1234667, 1234767, 1234867)):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
+
+    # Three more readings, each in the next 5 minute bucket
+    now = int(time.time())
+    for step, total in enumerate(totals, 1):
+        coordinator.async_set_updated_data(make_payload(total=total, last_api_call=now + step * 300))
+        await hass.async_block_till_done()
+    return now
+
+
+async def test_get_history_ignores_counter_glitch(hass, config_entry, fake_daytopper):
+    now = await _setup_with_history(hass, config_entry, totals=(1234667, 0, 1234867))
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "get_history",
+        {
+            "config_entry_id": config_entry.entry_id,
+            "start": dt_util.utc_from_timestamp(now - 3600),
+            "end": dt_util.utc_from_timestamp(now + 3600),
+            "resolution": "5min",
+            "inverter": "solax",
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    rows = response["inverters"]["solax"]
+    assert [row["energy"] for row in rows] == [0.0, 0.1, 0.0, 0.2]
+    assert [row["samples"] for row in rows] == [1, 1, 1, 1]
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_export_csv(hass, config_entry, fake_daytopper, tmp_path):
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    now = await _setup_with_history(hass, config_entry)
+    filename = tmp_path / "export.csv"
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "export",
+        {
+            "config_entry_id": config_entry.entry_id,
+            "filename": str(filename),
+            "start": dt_util.utc_from_timestamp(now - 3600),
+            "end": dt_util.utc_from_timestamp(now + 3600),
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    with open(filename, newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    # Four buckets for solax, enphase and the total
+    assert response["rows"] == len(rows) == 12
+    solax = [row for row in rows if row["inverter"] == "solax"]
+    assert [row["energy"] for row in solax[1:]] == ["0.1", "0.1", "0.1"]
+    assert rows == sorted(rows, key=lambda row: row["start"])
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_export_ndjson_one_inverter(hass, config_entry, fake_daytopper, tmp_path):
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    now = await _setup_with_history(hass, config_entry)
+    filename = tmp_path / "export.ndjson"
+
+    await hass.services.async_call(
+        DOMAIN,
+        "export",
+        {
+            "config_entry_id": config_entry.entry_id,
+            "filename": str(filename),
+            "start": dt_util.utc_from_timestamp(now - 3600),
+            "format": "ndjson",
+            "inverter": "enphase",
+        },
+        blocking=True,
+    )
+
+    with open(filename) as handle:
+        rows = [json.loads(line) for line in handle]
+    assert {row["inverter"] for row in rows} == {"enphase"}
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_export_outside_allowed_dirs(hass, config_entry, fake_daytopper, tmp_path):
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            "export",
+            {
+                "config_entry_id": config_entry.entry_id,
+                "filename": str(tmp_path / "export.csv"),
+                "start": dt_util.now(),
+            },
+            blocking=True,
+        )
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)